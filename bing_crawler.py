@@ -1,36 +1,42 @@
 import os
 import time
-import csv
-import re
+import atexit
+import asyncio
+import functools
+import multiprocessing
 import requests
-from urllib.parse import urljoin
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
-from threading import Thread, Lock
-from queue import Queue
 import json
+from threading import Lock
+from concurrent.futures import ProcessPoolExecutor
+from bing_fetch import (TieredFetcher, DriverPool, block_resources, DEFAULT_HTTP_CONCURRENCY, DEFAULT_BROWSER_WORKERS,
+                        DEFAULT_MAX_PAGES_PER_DRIVER, DEFAULT_MAX_DRIVER_MEMORY_MB, DEFAULT_PAGE_TIMEOUT, BROWSER_PROFILES)
+from bing_frontier import Frontier, keyword_relevance, DEFAULT_PER_HOST_CONCURRENCY, DEFAULT_PER_HOST_DELAY
+from bing_visited import make_visited_store, normalize_url
+from bing_parser import parse_page, init_worker
+from bing_output import make_crawl_sink
+from bing_dedupe import TextDeduper, parse_and_sign, DEFAULT_THRESHOLD as DEFAULT_DEDUPE_THRESHOLD
 
-# 全局控制变量
+# 全局控制变量，页面上通过 bing_crawler.cancel_crawl = True 中止爬取
 cancel_crawl = False
-continue_crawl = False
 BING_URL = "https://www.bing.com/search"
-visited_lock = Lock()  # 添加锁以确保线程安全
-
-def load_visited_urls(visited_file):
-    if os.path.exists(visited_file):
-        with open(visited_file, 'r', encoding='utf-8') as f:
-            return set(f.read().splitlines())
-    return set()
-
-def save_visited_urls(urls, visited_file):
-    with open(visited_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(urls))
+SEARCH_RETRIES = 2        # 每个搜索结果页失败后重试的次数
+SEARCH_RETRY_DELAY = 1.0  # 第一次重试前等待的秒数，之后每次翻倍
+DEFAULT_EXTRACT_WORKERS = min(4, os.cpu_count() or 1)  # 解析 HTML 的进程数
+DEFAULT_EXTRACT_QUEUE_SIZE = 64                         # 抓取和解析之间最多缓存的页面数
+# 进程内共用的 chromedriver 路径和浏览器池，多次运行之间保持预热
+_chromedriver_path = None
+_driver_pool = None
+_driver_pool_profile = None
+_driver_pool_lock = Lock()
 
 def load_config(config_file):
     if os.path.exists(config_file):
@@ -39,220 +45,418 @@ def load_config(config_file):
     return {}
 
 def save_config(config, config_file):
-    with open(config_file, 'w', encoding='utf-8') as f:
+    # 先写临时文件再替换，进程在写入途中被结束也不会留下半个 JSON
+    temp_file = config_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
         json.dump(config, f, ensure_ascii=False, indent=2)
+    os.replace(temp_file, config_file)
 
-def download_pdf(url, output_dir):
+def save_pdf(result, output_dir):
+    pdf_name = os.path.basename(result.url.split('?')[0]) or f"pdf_{int(time.time())}.pdf"
+    if not pdf_name.lower().endswith('.pdf'):
+        pdf_name += '.pdf'
+    pdf_path = os.path.join(output_dir, pdf_name)
     try:
-        response = requests.get(url, timeout=10, verify=False)  # 禁用SSL验证以解决握手问题
-        if response.status_code == 200 and 'application/pdf' in response.headers.get('Content-Type', ''):
-            pdf_name = os.path.basename(url.split('?')[0]) or f"pdf_{int(time.time())}.pdf"
-            pdf_path = os.path.join(output_dir, pdf_name)
-            with open(pdf_path, 'wb') as f:
-                f.write(response.content)
-            print(f"PDF下载成功: {pdf_path}")
-            return pdf_path
-    except Exception as e:
+        with open(pdf_path, 'wb') as f:
+            f.write(result.content)
+    except OSError as e:
         print(f"PDF下载失败: {str(e)}")
-    return None
-
-def search_bing(driver, query, regions, max_results, max_pages, since=None, until=None, progress_callback=None):
-    global cancel_crawl
-    search_results = set()
-    
-    for region in regions:
-        for page in range(max_pages):
-            if cancel_crawl or len(search_results) >= max_results:
-                break
-            
-            q = query
-            if since and until:
-                q += f" daterange:{since}-{until}"
-            params = {
-                'q': q,
-                'first': page * 10 + 1,
-                'cc': region
-            }
-            
+        return None
+    print(f"PDF下载成功: {pdf_path}")
+    return pdf_path
+
+def fetch_serp(driver, url):
+    """在 WebDriver 里打开一页搜索结果，返回 (结果链接, 是否有下一页)（在线程里执行）"""
+    driver.get(url)
+    WebDriverWait(driver, 15).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, 'ol#b_results'))
+    )
+    soup = BeautifulSoup(driver.page_source, 'html.parser')
+    links = [link.get('href') for link in soup.select('li.b_algo h2 a')]
+    return [url for url in links if url and url.startswith('http')], soup.select_one('a.sb_pagN') is not None
+
+async def search_bing(driver_pool, query, regions, max_results, max_pages, since=None, until=None, on_result=None,
+                      progress_callback=None, workers=None):
+    """workers 个协程并行抓取各地区的搜索结果页（默认等于浏览器池大小），按页码优先轮流分配给各地区；
+    每拿到一个新结果就 await on_result(url)，让内容爬取不必等搜索全部结束；
+    凑够 max_results 个不重复结果或取消时停止，返回结果列表"""
+    q = query
+    if since and until:
+        q += f" daterange:{since}-{until}"
+    jobs = iter([(region, page) for page in range(max_pages) for region in regions])
+    last_page = {region: max_pages - 1 for region in regions}  # 没有下一页的地区不再抓后面的页
+    search_results = {}
+
+    def finished():
+        return cancel_crawl or len(search_results) >= max_results
+
+    async def load(region, page):
+        params = {
+            'q': q,
+            'first': page * 10 + 1,
+            'cc': region
+        }
+        url = f"{BING_URL}?{requests.compat.urlencode(params)}"
+        for attempt in range(SEARCH_RETRIES + 1):
+            driver = await asyncio.to_thread(driver_pool.acquire)
             try:
-                url = f"{BING_URL}?{requests.compat.urlencode(params)}"
-                driver.get(url)
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'ol#b_results'))
-                )
-                
-                soup = BeautifulSoup(driver.page_source, 'html.parser')
-                results = soup.select('li.b_algo h2 a')
-                
-                for link in results:
-                    url = link.get('href')
-                    if url and url.startswith('http'):
-                        search_results.add(url)
-                        if progress_callback:
-                            try:
-                                progress_callback(f"搜索 {region} 第 {page+1} 页: {url}", len(search_results))
-                            except:
-                                print(f"进度回调失败于: {url}")
-                        if len(search_results) >= max_results:
-                            break
-                
-                next_page = soup.select_one('a.sb_pagN')
-                if not next_page:
-                    break
-                    
+                result = await asyncio.to_thread(fetch_serp, driver, url)
+            except TimeoutException:
+                await asyncio.to_thread(driver_pool.release, driver)
+                error = '加载超时'
             except Exception as e:
-                print(f"搜索失败: {str(e)}")
-                time.sleep(2)  # 在失败时添加延迟
+                await asyncio.to_thread(driver_pool.discard, driver)
+                error = str(e)
+            else:
+                await asyncio.to_thread(driver_pool.release, driver)
+                return result
+            print(f"搜索失败 {region} 第 {page+1} 页: {error}")
+            if attempt < SEARCH_RETRIES and not finished():
+                # 只推迟这一页，其他搜索页和内容爬取照常进行
+                await asyncio.sleep(SEARCH_RETRY_DELAY * 2 ** attempt)
+        return None
+
+    async def worker():
+        for region, page in jobs:
+            if finished():
+                return
+            if page > last_page[region]:
+                continue
+            result = await load(region, page)
+            if result is None:
                 continue
-    
+            links, has_next = result
+            if not has_next:
+                last_page[region] = min(last_page[region], page)
+            for url in links:
+                if finished():
+                    return
+                if url in search_results:
+                    continue
+                search_results[url] = None
+                if on_result:
+                    await on_result(url)
+                if progress_callback:
+                    try:
+                        progress_callback(f"搜索 {region} 第 {page+1} 页: {url}", len(search_results))
+                    except:
+                        print(f"进度回调失败于: {url}")
+
+    await asyncio.gather(*(worker() for _ in range(workers or driver_pool.size)))
     return list(search_results)
 
-def clean_content(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    for tag in soup(['script', 'style', 'nav', 'footer', 'header']):
-        tag.decompose()
-    text = soup.get_text(separator=' ', strip=True)
-    text = re.sub(r'\s+', ' ', text)
-    return text[:10000]
-
-def crawl_page(driver, url, visited, csv_file_path, pdf_dir, depth=1, max_depth=2, progress_callback=None):
-    global cancel_crawl
-    with visited_lock:  # 线程安全检查和更新
-        if cancel_crawl or url in visited or depth > max_depth:
-            return
-        visited.add(url)
-    
+def result_row(title, url, content, result):
+    """按 bing_output.CRAWL_COLUMNS 的顺序生成一行"""
+    return [title, url, content, result.status, result.via, round(result.elapsed, 3), result.size]
+
+async def fetch_page(fetcher, url, depth, pdf_dir, sink):
+    """抓取阶段：PDF 直接保存，返回 (状态, None)；HTML 返回 ('fetched', FetchResult) 交给解析阶段"""
     print(f"正在爬取 [第{depth}级]: {url}")
-    
+
     try:
-        if url.lower().endswith('.pdf'):
-            pdf_path = download_pdf(url, pdf_dir)
-            if pdf_path:
-                with open(csv_file_path, 'a', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["PDF文件", url, f"已下载至: {pdf_path}"])
-            return
-        
-        driver.get(url)
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.TAG_NAME, 'body'))
-        )
-        
-        title = driver.title or "无标题"
-        content = clean_content(driver.page_source)
-        
-        with open(csv_file_path, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([title, url, content])
-        
-        if progress_callback:
-            try:
-                with visited_lock:
-                    progress_callback(f"爬取: {url}", len(visited))
-            except:
-                print(f"进度回调失败于: {url}")
-            
-        if depth < max_depth:
-            links = driver.find_elements(By.TAG_NAME, 'a')
-            for link in links:
-                href = link.get_attribute('href')
-                if href and href.startswith('http'):
-                    absolute_url = urljoin(url, href)
-                    with visited_lock:
-                        if absolute_url not in visited:
-                            crawl_page(driver, absolute_url, visited, csv_file_path, pdf_dir, depth + 1, max_depth, progress_callback)
-                        
+        result = await fetcher.fetch(url)
+        if result is None:
+            return 'failed', None
+        if result.is_pdf:
+            pdf_path = await asyncio.to_thread(save_pdf, result, pdf_dir)
+            if not pdf_path:
+                return 'failed', None
+            sink.put(result_row("PDF文件", url, f"已下载至: {pdf_path}", result), url)
+            return 'done', None
+        return 'fetched', result
+
     except Exception as e:
         print(f"爬取失败: {str(e)}")
+        return 'failed', None
 
-def run_crawler(query, regions, max_results, max_pages, since, until, output_dir, max_depth=2, progress_callback=None):
-    global cancel_crawl, continue_crawl
-    
-    start_time = time.strftime("%Y%m%d_%H%M%S")
-    base_name = f"{query}_{start_time}"
-    csv_file_path = os.path.join(output_dir, f"{base_name}.csv")
-    visited_file = os.path.join(output_dir, f"{base_name}_visited.txt")
-    config_file = os.path.join(output_dir, f"{base_name}_config.json")
-    pdf_dir = os.path.join(output_dir, f"{base_name}_pdfs")
-    
-    os.makedirs(output_dir, exist_ok=True)
-    os.makedirs(pdf_dir, exist_ok=True)
-    
-    config = load_config(config_file)
-    if continue_crawl and config:
-        visited = load_visited_urls(visited_file)
-        urls = config.get('remaining_urls', [])
-        total_results = config.get('total_results', 0)
-    else:
-        if not os.path.exists(csv_file_path):
-            with open(csv_file_path, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                writer.writerow(['标题', 'URL', '内容'])
-        visited = load_visited_urls(visited_file)
-        urls = []
-        total_results = 0
-    
+async def extract_page(frontier, result, url, depth, sink, pool=None, score=None, deduper=None):
+    """解析阶段：pool 为进程池时在子进程里解析，写入 CSV 并把链接加入 frontier，返回 URL 状态 done / failed；
+    deduper 为 TextDeduper 时正文和已收录页面近似重复的不写入 CSV，返回 duplicate"""
+    try:
+        # 标题、正文和链接在一次解析里取出，去重时正文签名也在同一次调用里算好
+        extract = parse_and_sign if deduper is not None else parse_page
+        if pool is None:
+            extracted = extract(result.html, result.final_url)
+        else:
+            extracted = await asyncio.get_running_loop().run_in_executor(pool, extract, result.html, result.final_url)
+        page, signature = extracted if deduper is not None else (extracted, None)
+        status = 'done'
+        if deduper is not None:
+            canonical = deduper.check(url, signature)
+            if canonical:
+                print(f"跳过近似重复页面: {url}（与 {canonical} 相似）")
+                status = 'duplicate'
+        if status == 'done':
+            sink.put(result_row(page.title, url, page.text, result), url)
+
+        if depth < frontier.max_depth:
+            for absolute_url, text in page.links:
+                await frontier.add(absolute_url, depth + 1, score(absolute_url, text) if score else 0.0)
+        return status
+
+    except Exception as e:
+        print(f"解析失败: {url} {str(e)}")
+        return 'failed'
+
+async def crawl_urls(seeds, fetcher, frontier, sink, pdf_dir, progress_callback, num_workers, score=None,
+                     extract_workers=DEFAULT_EXTRACT_WORKERS, extract_queue_size=DEFAULT_EXTRACT_QUEUE_SIZE,
+                     deduper=None):
+    """seeds 为 [(url, depth)]；num_workers 个协程从 frontier 取 URL 抓取，抓到的 HTML 经过最多
+    extract_queue_size 页的队列交给 extract_workers 个进程解析（为 0 时在事件循环里解析）；
+    deduper 为 TextDeduper 时跳过正文近似重复的页面；结果交给 sink（bing_output.CrawlSink）写入，结束时关闭 sink；
+    返回 (本次爬取的页数, 没来得及爬取的 [url, depth])"""
+    for url, depth in seeds:
+        await frontier.add(normalize_url(url), depth)
+    crawled = 0
+    pages = asyncio.Queue(extract_queue_size)
+    # 用 spawn 启动解析进程，fork 会复制浏览器池等线程的锁状态
+    pool = ProcessPoolExecutor(max_workers=extract_workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=init_worker) if extract_workers else None
+
+    def mark_flushed():
+        # 结果写盘后才把 URL 记为已完成，进程被强制结束时还在写入队列里的页面下次会重新抓取
+        for done_url in sink.drain_flushed():
+            frontier.seen.mark(done_url, 'done')
+
+    async def finish(url, status):
+        nonlocal crawled
+        if status != 'done':
+            frontier.seen.mark(url, status)
+        mark_flushed()
+        await frontier.done(url)
+        if status == 'done':
+            crawled += 1
+            if progress_callback:
+                try:
+                    progress_callback(f"爬取: {url}", crawled)
+                except:
+                    print(f"进度回调失败于: {url}")
+
+    async def fetch_worker():
+        while True:
+            if cancel_crawl:
+                await frontier.close()
+                return
+            item = await frontier.get()
+            if item is None:
+                return
+            url, depth = item
+            status, result = 'failed', None
+            try:
+                status, result = await fetch_page(fetcher, url, depth, pdf_dir, sink)
+            finally:
+                # 抓完就归还站点配额，解析还没结束的页面仍算在途，frontier 不会提前结束
+                await frontier.fetched(url)
+                if result is None:
+                    await finish(url, status)
+            if result is not None:
+                # 队列满时在这里等待，内存里待解析的 HTML 不会无限增长
+                await pages.put((url, depth, result))
+
+    async def extract_worker():
+        while True:
+            item = await pages.get()
+            if item is None:
+                return
+            url, depth, result = item
+            status = 'failed'
+            try:
+                status = await extract_page(frontier, result, url, depth, sink, pool, score, deduper)
+            finally:
+                await finish(url, status)
+
+    extractors = [asyncio.create_task(extract_worker()) for _ in range(max(extract_workers, 1))]
+    try:
+        await asyncio.gather(*(fetch_worker() for _ in range(num_workers)))
+        for _ in extractors:
+            await pages.put(None)
+        await asyncio.gather(*extractors)
+    finally:
+        for task in extractors:
+            task.cancel()
+        await fetcher.close()
+        if pool is not None:
+            pool.shutdown()
+        await asyncio.to_thread(sink.close)
+        mark_flushed()
+    print(f"抓取方式: HTTP {fetcher.stats['http']} 个, 浏览器 {fetcher.stats['browser']} 个, "
+          f"跳过 {fetcher.stats['skipped']} 个, 失败 {fetcher.stats['failed']} 个")
+    return crawled, frontier.pending()
+
+def make_chrome_options(profile='fast'):
     options = Options()
+    if profile == 'fast':
+        # DOMContentLoaded 后就返回，不等图片、iframe 等子资源加载完
+        options.page_load_strategy = 'eager'
     options.add_argument('--headless')
     options.add_argument('--disable-gpu')
     options.add_argument('--no-sandbox')
     options.add_argument('--window-size=1920,1080')
     options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
     options.add_argument('--ignore-certificate-errors')  # 处理SSL错误
-    
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    
-    try:
-        if not continue_crawl or not urls:
-            urls = search_bing(driver, query, regions, max_results, max_pages, since, until, progress_callback)
-            total_results = len(urls)
-        
-        url_queue = Queue()
-        for url in urls:
-            url_queue.put(url)
-        
-        def worker():
-            # 每个线程拥有自己的驱动实例
-            thread_driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-            try:
-                while not url_queue.empty() and not cancel_crawl:
-                    url = url_queue.get()
-                    crawl_page(thread_driver, url, visited, csv_file_path, pdf_dir, max_depth=max_depth, progress_callback=progress_callback)
-                    url_queue.task_done()
-            finally:
-                thread_driver.quit()
-        
-        threads = []
-        num_threads = min(4, max(1, len(urls)))  # 确保至少有1个线程
-        for _ in range(num_threads):
-            t = Thread(target=worker)
-            t.start()
-            threads.append(t)
-        
-        for t in threads:
-            t.join()
-        
-        remaining_urls = list(url_queue.queue)
-        config = {
-            'query': query,
-            'regions': regions,
-            'max_results': max_results,
-            'max_pages': max_pages,
-            'since': since,
-            'until': until,
-            'total_results': total_results,
-            'remaining_urls': remaining_urls,
-            'output_dir': output_dir,
-            'max_depth': max_depth
+    return options
+
+def chromedriver_path():
+    # ChromeDriverManager().install() 每次都要联网查询版本，进程内只解析一次
+    global _chromedriver_path
+    if not _chromedriver_path or not os.path.exists(_chromedriver_path):
+        _chromedriver_path = ChromeDriverManager().install()
+    return _chromedriver_path
+
+def create_driver(profile='fast', page_timeout=DEFAULT_PAGE_TIMEOUT):
+    """profile 为 fast 时用 eager 加载策略，并通过 DevTools 拦截图片、字体、音视频、样式表和广告统计请求；
+    full 时和普通浏览器一样加载全部资源；page_timeout 为页面加载超时（秒）"""
+    if profile not in BROWSER_PROFILES:
+        raise ValueError(f"不支持的浏览器模式: {profile}")
+    driver = webdriver.Chrome(service=Service(chromedriver_path()), options=make_chrome_options(profile))
+    driver.set_page_load_timeout(page_timeout)
+    if profile == 'fast':
+        try:
+            block_resources(driver)
+        except WebDriverException as e:
+            # 拦截失败不影响抓取，只是加载慢一些
+            print(f"设置资源拦截失败: {str(e)}")
+    return driver
+
+def get_driver_pool(size=DEFAULT_BROWSER_WORKERS, max_pages=DEFAULT_MAX_PAGES_PER_DRIVER,
+                    max_memory_mb=DEFAULT_MAX_DRIVER_MEMORY_MB, profile='fast', page_timeout=DEFAULT_PAGE_TIMEOUT):
+    """返回进程内共用的浏览器池，参数变化时调整池子大小和回收阈值；浏览器模式或超时变化时换掉已启动的浏览器"""
+    global _driver_pool, _driver_pool_profile
+    factory = functools.partial(create_driver, profile, page_timeout)
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool(factory, size, max_pages, max_memory_mb)
+            atexit.register(_driver_pool.close)
+        else:
+            changed = _driver_pool_profile != (profile, page_timeout)
+            _driver_pool.configure(size, max_pages, max_memory_mb, factory if changed else None)
+        _driver_pool_profile = (profile, page_timeout)
+        return _driver_pool
+
+def run_crawler(query, regions, max_results, max_pages, since, until, output_dir, max_depth=2, progress_callback=None,
+                js_domains=(), num_workers=DEFAULT_HTTP_CONCURRENCY, browser_workers=DEFAULT_BROWSER_WORKERS,
+                max_pages_per_driver=DEFAULT_MAX_PAGES_PER_DRIVER, prewarm=True,
+                per_host_concurrency=DEFAULT_PER_HOST_CONCURRENCY, per_host_delay=DEFAULT_PER_HOST_DELAY, relevance=False,
+                visited_store='sqlite', resume=False, search_workers=None, extract_workers=DEFAULT_EXTRACT_WORKERS,
+                extract_queue_size=DEFAULT_EXTRACT_QUEUE_SIZE, dedupe=False, dedupe_threshold=DEFAULT_DEDUPE_THRESHOLD,
+                extra_formats=(), browser_profile='fast', page_timeout=DEFAULT_PAGE_TIMEOUT):
+    """js_domains 中的站点直接用浏览器抓取；其他页面先走 HTTP，判断为 JS 渲染时才用浏览器；
+    浏览器来自进程内共用的 DriverPool，prewarm 时在搜索的同时后台启动其余浏览器；
+    搜索结果页由 search_workers 个协程并行抓取（默认等于浏览器池大小），边搜索边爬取；
+    页面抓取（num_workers 个协程）和 HTML 解析（extract_workers 个进程）分开进行，中间的队列最多缓存 extract_queue_size 页；
+    链接按深度广度优先爬取，relevance 时同一深度内优先爬取锚文本/地址包含搜索词的链接；
+    visited_store 为 sqlite 时已爬过的 URL 记在 {query}_visited.db，同一查询的后续运行不再重复抓取，
+    memory / bloom 只在本次运行内去重（bloom 内存固定，适合上百万 URL）；
+    sqlite 下每个 URL 的入队/完成状态随爬随存，resume 时接着 {query}_crawl.json 记录的上一次未完成的运行继续，
+    即使进程被强制结束也不重爬已完成的页面；
+    dedupe 默认关闭，打开后按正文 SimHash 跳过和已收录页面汉明距离不超过 dedupe_threshold 的页面（不写入 CSV），
+    签名保存在 {query}_simhash.db；
+    结果由单独的写入线程批量写入 CSV，extra_formats 可以再加 parquet / jsonl；
+    browser_profile 为 fast 时浏览器不加载图片、字体、样式表和广告统计脚本，DOM 就绪即返回，
+    每页最多用 page_timeout 秒，超时后用已加载的部分；full 时加载完整页面"""
+    os.makedirs(output_dir, exist_ok=True)
+    state_file = os.path.join(output_dir, f"{query}_crawl.json")
+    visited_db = os.path.join(output_dir, f"{query}_visited.db")
+    signature_db = os.path.join(output_dir, f"{query}_simhash.db")
+
+    state = load_config(state_file) if resume else {}
+    if state and (state.get('finished') or state.get('visited_store') != 'sqlite'):
+        print("上一次爬取已完成或没有保存断点，重新开始")
+        state = {}
+    if state:
+        run_id = state['run_id']
+        visited_store = 'sqlite'
+        print(f"继续爬取 {run_id}")
+    else:
+        run_id = time.strftime("%Y%m%d_%H%M%S")
+        state = {
+            'run_id': run_id,
+            'csv_file_path': os.path.join(output_dir, f"{query}_{run_id}.csv"),
+            'pdf_dir': os.path.join(output_dir, f"{query}_{run_id}_pdfs"),
+            'search_done': False,
+            'finished': False,
+            'total_results': 0,
+            'duplicates': 0
         }
-        save_config(config, config_file)
-        save_visited_urls(visited, visited_file)
-    
+    state.update({
+        'query': query,
+        'regions': regions,
+        'max_results': max_results,
+        'max_pages': max_pages,
+        'since': since,
+        'until': until,
+        'output_dir': output_dir,
+        'max_depth': max_depth,
+        'js_domains': list(js_domains),
+        'visited_store': visited_store,
+        'dedupe_threshold': dedupe_threshold if dedupe else None,
+        'extra_formats': list(extra_formats),
+        'browser_profile': browser_profile,
+        'page_timeout': page_timeout
+    })
+    csv_file_path = state['csv_file_path']
+    pdf_dir = state['pdf_dir']
+    os.makedirs(pdf_dir, exist_ok=True)
+    save_config(state, state_file)
+
+    driver_pool = get_driver_pool(browser_workers, max_pages_per_driver, profile=browser_profile,
+                                  page_timeout=page_timeout)
+    if prewarm:
+        driver_pool.prewarm()
+
+    async def search(frontier):
+        try:
+            urls = await search_bing(driver_pool, query, regions, max_results, max_pages, since, until,
+                                     lambda url: frontier.add(normalize_url(url), 1), progress_callback, search_workers)
+            if not cancel_crawl:
+                # 搜索结果入库后才记为搜索完成，之前被中断的话继续时重新搜索，已入队的 URL 不会重复
+                visited.flush()
+                state['search_done'] = True
+                state['total_results'] = len(urls)
+                save_config(state, state_file)
+        finally:
+            await frontier.close_feed()
+
+    async def crawl():
+        fetcher = TieredFetcher(driver_pool, js_domains=js_domains, http_concurrency=num_workers,
+                                page_timeout=page_timeout)
+        frontier = Frontier(max_depth, seen=visited, per_host_concurrency=per_host_concurrency,
+                            per_host_delay=per_host_delay)
+        await frontier.restore(visited.pending())
+        search_task = None
+        if not state['search_done']:
+            # 搜索和内容爬取同时进行，搜到的结果直接进入 frontier
+            frontier.open_feed()
+            search_task = asyncio.create_task(search(frontier))
+        try:
+            return await crawl_urls([], fetcher, frontier, sink, pdf_dir, progress_callback,
+                                    num_workers, keyword_relevance(query) if relevance else None,
+                                    extract_workers, extract_queue_size, deduper)
+        finally:
+            if search_task:
+                await search_task
+
+    visited = make_visited_store(visited_store, visited_db, **({'run_id': run_id} if visited_store == 'sqlite' else {}))
+    deduper = TextDeduper(signature_db, dedupe_threshold) if dedupe else None
+    sink = make_crawl_sink(csv_file_path, extra_formats)
+    try:
+        crawled, remaining = asyncio.run(crawl())
+        total_crawled = visited.count('done')
     finally:
-        driver.quit()
-    
-    print(f"\n完成! 共爬取 {len(visited)} 个结果")
-    return csv_file_path, len(visited)
+        sink.close()
+        visited.close()
+        if deduper is not None:
+            deduper.close()
+    state['finished'] = state['search_done'] and not remaining
+    if deduper is not None:
+        state['duplicates'] = state.get('duplicates', 0) + deduper.duplicates
+        print(f"正文去重: 本次跳过 {deduper.duplicates} 个近似重复页面, 本轮共跳过 {state['duplicates']} 个")
+    save_config(state, state_file)
+    print(f"写入: {sink.stats['rows']} 行, {sink.stats['flushes']} 次写盘, 输出文件 {', '.join(sink.file_paths)}")
+    print(f"浏览器池: 已启动 {driver_pool.stats['started']} 个, 已回收 {driver_pool.stats['recycled']} 个")
+
+    print(f"\n完成! 本次爬取 {crawled} 个, 本轮共爬取 {total_crawled} 个结果")
+    return csv_file_path, total_crawled
 
 if __name__ == '__main__':
     run_crawler("TAICCA", ['TW', 'CN', 'US', 'JP'], 100, 10, None, None, r'D:\spider\chat_spider\bing')
\ No newline at end of file
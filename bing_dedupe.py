@@ -0,0 +1,58 @@
+import re
+import sqlite3
+import hashlib
+from collections import Counter
+
+import numpy as np
+
+from hamming_index import HammingIndex
+from bing_parser import parse_page
+
+# 页面正文的 SimHash 近似去重：镜像站、转载和套模板的页面地址不同、正文几乎一样，按 URL 去重识别不了
+SHINGLE_SIZE = 3        # 连续 3 个词（中日韩文字按单字）作为一个特征
+DEFAULT_THRESHOLD = 3   # 汉明距离不超过阈值视为近似重复
+MIN_TOKENS = 50         # 正文太短时签名不稳定，不参与去重
+CJK_CHARS = '\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af'  # 假名、汉字、谚文
+TOKEN_PATTERN = re.compile(f'[{CJK_CHARS}]|[^\\W_{CJK_CHARS}]+')
+
+def simhash(text):
+    """按词频加权的 64 位 SimHash，正文过短时返回 None（可在进程池里执行）"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < MIN_TOKENS:
+        return None
+    shingles = Counter(' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1))
+    digests = b''.join(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles)
+    # 每行是一个特征哈希的 64 位，取值 0/1
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    weights = np.fromiter(shingles.values(), dtype=np.int64, count=len(shingles))
+    scores = weights @ (bits.astype(np.int64) * 2 - 1)
+    return int.from_bytes(np.packbits(scores > 0, bitorder='little').tobytes(), 'little')
+
+def parse_and_sign(page_html, base_url=''):
+    """解析页面并计算正文签名，返回 (PageContent, simhash)；在进程池里一起做，正文不用传回主进程后再送进子进程"""
+    page = parse_page(page_html, base_url)
+    return page, simhash(page.text)
+
+class TextDeduper:
+    """db_path 为 None 时只在本次运行内去重，否则签名保存在磁盘上，同一查询的后续运行也会跳过近似重复的页面"""
+    def __init__(self, db_path=None, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.conn = sqlite3.connect(db_path or ':memory:')
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.signatures = HammingIndex(self.conn, 'page_signatures', 'url', 'simhash', threshold)
+        self.duplicates = 0
+
+    def check(self, url, value):
+        """新页面记入索引并返回 None，近似重复时返回先收录的页面地址；value 为 simhash 的结果"""
+        if value is None:
+            return None
+        canonical = self.signatures.find(value)
+        if canonical is None or canonical == url:
+            self.signatures.add(value, url)
+            return None
+        self.duplicates += 1
+        return canonical
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,408 @@
+import re
+import time
+import asyncio
+import threading
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 按内存回收浏览器需要 psutil，未安装时只按页数回收
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 分层抓取：先用连接池里的 HTTP 请求直接拿 HTML，判断为 JS 渲染的页面才交给 Chrome
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+DEFAULT_HTTP_CONCURRENCY = 32
+DEFAULT_BROWSER_WORKERS = 2
+DEFAULT_MAX_PAGES_PER_DRIVER = 100  # 每个浏览器加载这么多页后重启，避免内存越用越多
+DEFAULT_MAX_DRIVER_MEMORY_MB = 1536
+MIN_TEXT_LENGTH = 200               # 去掉标签后可见文字少于这个长度视为需要渲染
+FALLBACK_STATUS = {403, 429, 503}   # 常见的反爬拦截，用浏览器再试一次
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+DEFAULT_MAX_HTML_BYTES = 5 * 1024 * 1024    # 超过这个大小的 HTML 不下载完，直接跳过
+DEFAULT_MAX_PDF_BYTES = 50 * 1024 * 1024
+DEFAULT_PAGE_TIMEOUT = 15           # 浏览器打开一页的总时间预算（秒），包括等待 body 出现
+BROWSER_PROFILES = ('fast', 'full')
+NAVIGATION_STATUS_SCRIPT = ("const entry = performance.getEntriesByType('navigation')[0];"
+                            "return entry && entry.responseStatus ? entry.responseStatus : null;")
+# fast 模式下通过 DevTools 拦截的请求：提取正文用不到的图片、字体、音视频和样式表，以及常见的广告/统计域名
+BLOCKED_EXTENSIONS = ('png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp',
+                      'woff', 'woff2', 'ttf', 'otf', 'eot',
+                      'mp4', 'webm', 'm3u8', 'mp3', 'ogg', 'wav', 'flv', 'mov',
+                      'css')
+# 只匹配路径结尾（可带查询参数），避免误拦 x.css.example.com 这类域名
+BLOCKED_RESOURCE_PATTERNS = [pattern for ext in BLOCKED_EXTENSIONS for pattern in (f'*.{ext}', f'*.{ext}?*')]
+BLOCKED_HOSTS = (
+    'doubleclick.net', 'googlesyndication.com', 'googleadservices.com', 'google-analytics.com',
+    'googletagmanager.com', 'googletagservices.com', 'adservice.google.com', 'connect.facebook.net',
+    'amazon-adsystem.com', 'adnxs.com', 'criteo.com', 'criteo.net', 'taboola.com', 'outbrain.com',
+    'scorecardresearch.com', 'quantserve.com', 'hotjar.com', 'clarity.ms', 'bat.bing.com',
+    'hm.baidu.com', 'cnzz.com', 'umeng.com', 'tanx.com', 'mmstat.com',
+)
+BLOCKED_URL_PATTERNS = BLOCKED_RESOURCE_PATTERNS + [f'*://*.{host}/*' for host in BLOCKED_HOSTS] + \
+                       [f'*://{host}/*' for host in BLOCKED_HOSTS]
+
+SCRIPT_STYLE_PATTERN = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.S | re.I)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+# 单页应用的空挂载点和“请启用 JavaScript”提示
+SPA_MARKERS = [
+    re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.I),
+    re.compile(r'<app-root[^>]*>\s*</app-root>', re.I),
+    re.compile(r'<noscript[^>]*>[^<]*(enable javascript|javascript is required|启用 ?JavaScript)', re.I),
+]
+
+class FetchResult(NamedTuple):
+    url: str
+    final_url: str
+    status: Optional[int]   # 浏览器抓取且拿不到真实状态码时为 None
+    content_type: str
+    html: Optional[str]     # PDF 时为 None
+    content: bytes          # 只有 PDF 时保留原始字节
+    via: str                # 'http' / 'browser'
+    elapsed: float
+    size: int = 0           # 下载的字节数，浏览器抓取时为页面源码的大小
+
+    @property
+    def is_pdf(self):
+        return 'application/pdf' in self.content_type
+
+def visible_text_length(html):
+    return len(' '.join(TAG_PATTERN.sub(' ', SCRIPT_STYLE_PATTERN.sub(' ', html)).split()))
+
+def needs_browser(html, min_text_length=MIN_TEXT_LENGTH):
+    """HTML 几乎没有可见文字或带有单页应用的特征时返回 True"""
+    if any(marker.search(html) for marker in SPA_MARKERS):
+        return True
+    return visible_text_length(html) < min_text_length
+
+def decode_html(response, content):
+    # 很多中文站点只在 meta 里声明编码，响应头里没有 charset
+    encoding = response.charset_encoding
+    if not encoding:
+        match = META_CHARSET_PATTERN.search(content[:4096])
+        encoding = match.group(1).decode('ascii') if match else 'utf-8'
+    try:
+        return content.decode(encoding, errors='replace')
+    except LookupError:
+        return content.decode('utf-8', errors='replace')
+
+async def read_limited(response, limit):
+    """读取流式响应的正文，content-length 或实际读到的字节数超过 limit 时返回 None，不再继续下载"""
+    content_length = response.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > limit:
+        return None
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+def host_of(url):
+    return (urlsplit(url).hostname or '').lower()
+
+def make_http_client(max_connections=DEFAULT_HTTP_CONCURRENCY, timeout=15.0, http2=True):
+    # 原来的 PDF 下载和 Chrome 都忽略了证书错误，这里保持一致
+    return httpx.AsyncClient(
+        http2=http2 and HTTP2_AVAILABLE,
+        verify=False,
+        follow_redirects=True,
+        timeout=httpx.Timeout(timeout, connect=5.0),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        headers={'user-agent': USER_AGENT, 'accept-language': 'zh-CN,zh;q=0.9,en;q=0.8'},
+    )
+
+def block_resources(driver, patterns=BLOCKED_URL_PATTERNS):
+    """通过 DevTools 让浏览器直接拒绝匹配 patterns 的请求（支持 * 通配符），patterns 为空时取消拦截"""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+
+def navigation_status(driver):
+    """Chrome 记录的主文档 HTTP 状态码（Navigation Timing 的 responseStatus），拿不到时返回 None"""
+    try:
+        status = driver.execute_script(NAVIGATION_STATUS_SCRIPT)
+    except WebDriverException:
+        return None
+    return status if isinstance(status, int) and status > 0 else None
+
+def browser_get(driver, url, timeout=DEFAULT_PAGE_TIMEOUT):
+    """在 WebDriver 里打开页面，返回 (最终地址, 渲染后的 HTML, 状态码)（在线程里执行）；
+    timeout 为这一页的总预算，浏览器的页面加载超时（set_page_load_timeout）先到时停止加载，用已经加载的部分"""
+    deadline = time.monotonic() + timeout
+    try:
+        driver.get(url)
+    except TimeoutException:
+        driver.execute_script('window.stop();')
+    WebDriverWait(driver, max(deadline - time.monotonic(), 0.5)).until(
+        EC.presence_of_element_located((By.TAG_NAME, 'body')))
+    return driver.current_url, driver.page_source, navigation_status(driver)
+
+def driver_memory_mb(driver):
+    """chromedriver 及其启动的 Chrome 进程的总 RSS，无法获取时返回 None"""
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        return sum(p.memory_info().rss for p in [process, *process.children(recursive=True)]) / 1048576
+    except (AttributeError, psutil.Error):
+        return None
+
+# 预热的浏览器池：线程安全，可跨多次运行复用；每个浏览器加载 max_pages 页或内存超过 max_memory_mb 后重启
+class DriverPool:
+    def __init__(self, factory, size=DEFAULT_BROWSER_WORKERS, max_pages=DEFAULT_MAX_PAGES_PER_DRIVER,
+                 max_memory_mb=DEFAULT_MAX_DRIVER_MEMORY_MB):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.stats = {'started': 0, 'recycled': 0}
+        self._cond = threading.Condition()
+        self._idle = []
+        self._pages = {}      # driver -> 启动后加载的页数
+        self._stale = set()   # 换了 factory 之前启动的浏览器，归还时关闭
+        self._starting = 0
+        self._closed = False
+
+    @property
+    def total(self):
+        return len(self._pages) + self._starting
+
+    def configure(self, size=None, max_pages=None, max_memory_mb=None, factory=None):
+        """factory 不为 None 时换用新的启动方式，空闲的浏览器立即关闭，使用中的归还时关闭"""
+        with self._cond:
+            self.size = size or self.size
+            self.max_pages = max_pages or self.max_pages
+            self.max_memory_mb = max_memory_mb or self.max_memory_mb
+            self._closed = False
+            if factory is not None:
+                self.factory = factory
+                self._stale.update(self._pages)
+                surplus, self._idle = self._idle, []
+            else:
+                surplus = [self._idle.pop() for _ in range(min(len(self._idle), max(self.total - self.size, 0)))]
+            for driver in surplus:
+                del self._pages[driver]
+                self._stale.discard(driver)
+            self._cond.notify_all()
+        for driver in surplus:
+            _quit_quietly(driver)
+
+    def _start(self):
+        # 调用前已把 _starting 加 1
+        factory = self.factory
+        try:
+            driver = factory()
+        except Exception:
+            with self._cond:
+                self._starting -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._starting -= 1
+            self._pages[driver] = 0
+            if factory is not self.factory:
+                self._stale.add(driver)
+            self.stats['started'] += 1
+        return driver
+
+    def prewarm(self, count=None, wait=False):
+        """在后台线程里把池子补到 count 个浏览器（默认 size），wait 为 True 时等待启动完成"""
+        with self._cond:
+            need = max(min(count or self.size, self.size) - self.total, 0)
+            self._starting += need
+        threads = [threading.Thread(target=self._prewarm_one, daemon=True) for _ in range(need)]
+        for thread in threads:
+            thread.start()
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _prewarm_one(self):
+        try:
+            driver = self._start()
+        except Exception as e:
+            print(f"浏览器启动失败: {str(e)}")
+            return
+        with self._cond:
+            if not self._closed:
+                self._idle.append(driver)
+                self._cond.notify_all()
+                return
+        self.discard(driver)
+
+    def acquire(self):
+        """取一个空闲浏览器，池子没满时启动新的，满了则等待归还"""
+        with self._cond:
+            while not self._idle and self.total >= self.size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._starting += 1
+        return self._start()
+
+    def release(self, driver, pages=1):
+        with self._cond:
+            self._pages[driver] += pages
+            recycle = self._closed or driver in self._stale or self._pages[driver] >= self.max_pages
+        if not recycle:
+            memory = driver_memory_mb(driver)
+            recycle = memory is not None and memory > self.max_memory_mb
+        if recycle:
+            self.discard(driver)
+            with self._cond:
+                self.stats['recycled'] += 1
+                closed = self._closed
+            if not closed:
+                self.prewarm()
+            return
+        with self._cond:
+            self._idle.append(driver)
+            self._cond.notify_all()
+
+    def discard(self, driver):
+        """浏览器崩溃或需要回收时调用，不再放回池子"""
+        with self._cond:
+            self._pages.pop(driver, None)
+            self._stale.discard(driver)
+            self._cond.notify_all()
+        _quit_quietly(driver)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for driver in idle:
+                del self._pages[driver]
+                self._stale.discard(driver)
+            self._cond.notify_all()
+        for driver in idle:
+            _quit_quietly(driver)
+
+def _quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+class UseBrowser(NamedTuple):
+    """fetch_http 的返回值，表示需要用浏览器重新抓取"""
+    status: Optional[int]   # HTTP 请求拿到的状态码，浏览器拿不到真实状态码时记录这个
+
+class TieredFetcher:
+    """driver_pool 为 DriverPool，浏览器只在需要时才从池子里取；js_domains 中的站点直接走浏览器"""
+    def __init__(self, driver_pool, js_domains=(), http_concurrency=DEFAULT_HTTP_CONCURRENCY,
+                 min_text_length=MIN_TEXT_LENGTH, client=None, page_timeout=DEFAULT_PAGE_TIMEOUT,
+                 max_html_bytes=DEFAULT_MAX_HTML_BYTES, max_pdf_bytes=DEFAULT_MAX_PDF_BYTES):
+        self.driver_pool = driver_pool
+        self.max_html_bytes = max_html_bytes
+        self.max_pdf_bytes = max_pdf_bytes
+        self.page_timeout = page_timeout
+        self.js_domains = {domain.lower().lstrip('.') for domain in js_domains}
+        self.min_text_length = min_text_length
+        self.own_client = client is None
+        self.client = client or make_http_client(http_concurrency)
+        # 等待浏览器的请求在协程里排队，不占用线程池
+        self.browser_semaphore = asyncio.Semaphore(driver_pool.size)
+        self.stats = {'http': 0, 'browser': 0, 'skipped': 0, 'failed': 0}
+
+    def is_js_domain(self, url):
+        host = host_of(url)
+        return any(host == domain or host.endswith('.' + domain) for domain in self.js_domains)
+
+    async def fetch(self, url):
+        """返回 FetchResult；非 HTML/PDF 内容或请求失败返回 None"""
+        if self.is_js_domain(url):
+            return await self.fetch_browser(url)
+        start = time.perf_counter()
+        try:
+            result = await self.fetch_http(url, start)
+        except httpx.TimeoutException:
+            # 超时可能是站点对非浏览器的请求限速，交给浏览器再试一次
+            return await self.fetch_browser(url)
+        except httpx.HTTPError:
+            # DNS 解析失败、拒绝连接等站点本身打不开的错误，浏览器也打不开，不占用浏览器
+            self.stats['failed'] += 1
+            return None
+        if isinstance(result, UseBrowser):
+            return await self.fetch_browser(url, result.status)
+        return result
+
+    async def fetch_http(self, url, start):
+        """流式请求，先看状态码、content-type 和 content-length 再读正文；
+        返回 FetchResult、None（跳过或失败）或 UseBrowser（被拦截或需要渲染）"""
+        async with self.client.stream('GET', url) as response:
+            if response.status_code in FALLBACK_STATUS:
+                return UseBrowser(response.status_code)
+            if response.status_code >= 400:
+                self.stats['failed'] += 1
+                return None
+            content_type = response.headers.get('content-type', '').lower()
+            is_pdf = 'application/pdf' in content_type
+            if not is_pdf and content_type and not content_type.startswith(HTML_TYPES):
+                self.stats['skipped'] += 1
+                return None
+            content = await read_limited(response, self.max_pdf_bytes if is_pdf else self.max_html_bytes)
+            if content is None:
+                print(f"页面过大，跳过: {url}")
+                self.stats['skipped'] += 1
+                return None
+        final_url = str(response.url)
+        if is_pdf:
+            self.stats['http'] += 1
+            return FetchResult(url, final_url, response.status_code, content_type, None, content,
+                               'http', time.perf_counter() - start, len(content))
+        html = decode_html(response, content)
+        if needs_browser(html, self.min_text_length):
+            return UseBrowser(response.status_code)
+        self.stats['http'] += 1
+        return FetchResult(url, final_url, response.status_code, content_type or 'text/html', html, b'',
+                           'http', time.perf_counter() - start, len(content))
+
+    async def fetch_browser(self, url, http_status=None):
+        """状态码优先用 Chrome 记录的真实状态码，拿不到时用之前 HTTP 请求的状态码（http_status），都没有时为 None"""
+        start = time.perf_counter()
+        async with self.browser_semaphore:
+            try:
+                driver = await asyncio.to_thread(self.driver_pool.acquire)
+            except Exception as e:
+                print(f"浏览器启动失败: {str(e)}")
+                self.stats['failed'] += 1
+                return None
+            try:
+                final_url, html, status = await asyncio.to_thread(browser_get, driver, url, self.page_timeout)
+            except TimeoutException:
+                await asyncio.to_thread(self.driver_pool.release, driver)
+                print(f"浏览器加载超时: {url}")
+                self.stats['failed'] += 1
+                return None
+            except Exception as e:
+                # 浏览器可能已经崩溃，换一个新的
+                await asyncio.to_thread(self.driver_pool.discard, driver)
+                print(f"浏览器加载失败: {url} {str(e)}")
+                self.stats['failed'] += 1
+                return None
+            await asyncio.to_thread(self.driver_pool.release, driver)
+        self.stats['browser'] += 1
+        return FetchResult(url, final_url, status or http_status, 'text/html', html, b'', 'browser',
+                           time.perf_counter() - start, len(html.encode('utf-8')))
+
+    async def close(self):
+        # 浏览器归 DriverPool 管理，运行结束后留在池子里给下一次用
+        if self.own_client:
+            await self.client.aclose()
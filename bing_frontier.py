@@ -0,0 +1,130 @@
+import re
+import heapq
+import asyncio
+from collections import defaultdict
+
+from bing_fetch import host_of
+from bing_visited import MemoryVisited
+
+# 广度优先的爬取边界：按 (深度, -相关度) 排序，同一站点限制并发数和请求间隔
+DEFAULT_PER_HOST_CONCURRENCY = 2
+DEFAULT_PER_HOST_DELAY = 0.5  # 同一站点两次请求之间至少间隔的秒数
+
+def keyword_relevance(query):
+    """按查询词在链接地址和锚文本里出现的次数打分，用作 Frontier 的 score"""
+    terms = [term.lower() for term in re.split(r'\s+', query) if term]
+
+    def score(url, text=''):
+        haystack = f"{url} {text}".lower()
+        return float(sum(haystack.count(term) for term in terms))
+    return score
+
+class Frontier:
+    """所有 worker 共用的待爬队列；seen 为 bing_visited 里的已访问存储，用来去重；
+    get 在没有可爬的 URL、没有在途请求且没有打开的 feed 时返回 None"""
+    def __init__(self, max_depth, seen=None, per_host_concurrency=DEFAULT_PER_HOST_CONCURRENCY,
+                 per_host_delay=DEFAULT_PER_HOST_DELAY):
+        self.max_depth = max_depth
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_delay = per_host_delay
+        self.seen = seen if seen is not None else MemoryVisited()
+        self._queues = {}                   # host -> [(depth, -score, seq, url)]
+        self._active = defaultdict(int)     # host -> 在途请求数
+        self._next_time = {}                # host -> 下一次允许请求的时间
+        self._in_flight = 0
+        self._feeds = 0                     # 仍在产出 URL 的外部来源数，例如搜索结果
+        self._seq = 0
+        self._closed = False
+        self._cond = asyncio.Condition()
+
+    def __len__(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _push(self, url, depth, score):
+        host = host_of(url)
+        self._seq += 1
+        heapq.heappush(self._queues.setdefault(host, []), (depth, -score, self._seq, url))
+
+    async def add(self, url, depth, score=0.0):
+        """加入新发现的 URL（应先 normalize_url），已见过或超过最大深度时返回 False"""
+        if depth > self.max_depth or not self.seen.add(url, depth):
+            return False
+        async with self._cond:
+            self._push(url, depth, score)
+            self._cond.notify_all()
+        return True
+
+    async def restore(self, entries):
+        """断点续爬时放回上次没爬完的 [url, depth]，这些 URL 已在 seen 里，不再检查"""
+        async with self._cond:
+            for url, depth in entries:
+                if depth <= self.max_depth:
+                    self._push(url, depth, 0.0)
+            self._cond.notify_all()
+
+    async def get(self):
+        """返回 (url, depth)，用完后必须调用 fetched(url) 和 done(url)"""
+        loop = asyncio.get_running_loop()
+        async with self._cond:
+            while not self._closed:
+                now = loop.time()
+                best_host = None
+                wake_at = None
+                for host, queue in self._queues.items():
+                    if self._active[host] >= self.per_host_concurrency:
+                        continue
+                    ready_at = self._next_time.get(host, 0)
+                    if ready_at > now:
+                        wake_at = ready_at if wake_at is None else min(wake_at, ready_at)
+                        continue
+                    if best_host is None or queue[0] < self._queues[best_host][0]:
+                        best_host = host
+                if best_host is not None:
+                    queue = self._queues[best_host]
+                    depth, _, _, url = heapq.heappop(queue)
+                    if not queue:
+                        del self._queues[best_host]
+                    self._active[best_host] += 1
+                    self._next_time[best_host] = now + self.per_host_delay
+                    self._in_flight += 1
+                    return url, depth
+                if not self._queues and not self._in_flight and not self._feeds:
+                    return None
+                # 等待其他 worker 归还站点配额、发现新链接，或最近的站点间隔结束
+                try:
+                    await asyncio.wait_for(self._cond.wait(), None if wake_at is None else wake_at - now)
+                except asyncio.TimeoutError:
+                    pass
+        return None
+
+    async def fetched(self, url):
+        """页面抓取结束（还没解析完）时调用，归还站点配额"""
+        async with self._cond:
+            self._active[host_of(url)] -= 1
+            self._cond.notify_all()
+
+    async def done(self, url):
+        """页面处理完、新链接都已加入后调用；get 返回的每个 URL 都要先调用 fetched 再调用 done"""
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def open_feed(self):
+        """外部来源开始往 frontier 里加 URL，结束前 get 不会因为队列暂时为空而返回 None"""
+        self._feeds += 1
+
+    async def close_feed(self):
+        async with self._cond:
+            self._feeds -= 1
+            self._cond.notify_all()
+
+    async def close(self):
+        """取消爬取时调用，等待中的 get 立即返回 None"""
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def pending(self):
+        """尚未爬取的 [url, depth]，按优先级排序"""
+        entries = sorted(entry for queue in self._queues.values() for entry in queue)
+        return [[url, depth] for depth, _, _, url in entries]
@@ -0,0 +1,133 @@
+import os
+import csv
+import json
+import time
+import queue
+import threading
+from collections import deque
+
+from parquet_output import PartedParquetWriter
+
+# 爬取结果的单线程写入：各个协程只把行放进队列，由一个写入线程批量写 CSV（以及可选的 Parquet / JSONL）
+CRAWL_COLUMNS = ['标题', 'URL', '内容', '状态码', '抓取方式', '耗时', '字节数']
+INT_COLUMNS = ('状态码', '字节数')
+FLOAT_COLUMNS = ('耗时',)
+EXTRA_FORMATS = ('parquet', 'jsonl')
+
+class CsvWriter:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        exists = os.path.exists(file_path)
+        # 已有文件（断点续爬）时追加，不再重复写表头
+        self.f = open(file_path, 'a' if exists else 'w', encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.f)
+        if not exists:
+            self.writer.writerow(CRAWL_COLUMNS)
+            self.f.flush()
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+class JsonlWriter:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.f = open(file_path, 'a', encoding='utf-8')
+
+    def write_rows(self, rows):
+        self.f.write(''.join(json.dumps(dict(zip(CRAWL_COLUMNS, row)), ensure_ascii=False) + '\n' for row in rows))
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+class CrawlSink(threading.Thread):
+    """写入线程：put 放入的行攒够 flush_rows 行或距上次写盘超过 flush_interval 秒时批量写出，close 时写完剩余的行；
+    写盘后的 key 放进 flushed，爬虫据此把 URL 记为已完成，进程被强制结束时没写盘的页面会重新抓取"""
+    def __init__(self, writers, flush_rows=100, flush_interval=2.0):
+        super().__init__(daemon=True)
+        self.writers = writers
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.flushed = deque()
+        self.error = None
+        self._closed = False
+        self.stats = {'rows': 0, 'flushes': 0}
+        self.start()
+
+    @property
+    def file_paths(self):
+        # Parquet 在第一次写入时才创建文件，没写过的不列出
+        return [writer.file_path for writer in self.writers if writer.file_path]
+
+    def put(self, row, key=None):
+        if self.error is not None:
+            raise self.error
+        self.queue.put((row, key))
+
+    def drain_flushed(self):
+        """取出已写盘的 key（在调用 put 的线程里使用）"""
+        keys = []
+        while self.flushed:
+            keys.append(self.flushed.popleft())
+        return keys
+
+    def run(self):
+        rows, keys = [], []
+        last_flush = time.monotonic()
+        closing = False
+        while not closing:
+            try:
+                item = self.queue.get(timeout=max(last_flush + self.flush_interval - time.monotonic(), 0.01))
+            except queue.Empty:
+                item = ()
+            if item is None:
+                closing = True
+            elif item:
+                rows.append(item[0])
+                keys.append(item[1])
+            now = time.monotonic()
+            if closing or len(rows) >= self.flush_rows or now - last_flush >= self.flush_interval:
+                if rows:
+                    self._write(rows, keys)
+                    rows, keys = [], []
+                last_flush = now
+
+    def _write(self, rows, keys):
+        try:
+            for writer in self.writers:
+                writer.write_rows(rows)
+        except Exception as e:
+            print(f"写入结果失败: {str(e)}")
+            self.error = e
+            return
+        self.flushed.extend(key for key in keys if key is not None)
+        self.stats['rows'] += len(rows)
+        self.stats['flushes'] += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(None)
+        self.join()
+        for writer in self.writers:
+            writer.close()
+
+def make_crawl_sink(csv_path, extra_formats=(), **kwargs):
+    """总是写 csv_path，extra_formats 中的 parquet / jsonl 写到同名的 .parquet / .jsonl"""
+    for output_format in extra_formats:
+        if output_format not in EXTRA_FORMATS:
+            raise ValueError(f"不支持的输出格式: {output_format}")
+    stem = os.path.splitext(csv_path)[0]
+    writers = [CsvWriter(csv_path)]
+    if 'parquet' in extra_formats:
+        column_types = {**{name: 'int' for name in INT_COLUMNS}, **{name: 'float' for name in FLOAT_COLUMNS}}
+        writers.append(PartedParquetWriter(stem + '.parquet', CRAWL_COLUMNS, column_types))
+    if 'jsonl' in extra_formats:
+        writers.append(JsonlWriter(stem + '.jsonl'))
+    return CrawlSink(writers, **kwargs)
@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import glob
+import time
+import threading
+import multiprocessing
+from typing import NamedTuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from bing_visited import normalize_url
+
+# 有 lxml 时直接用 lxml.html 解析，比 BeautifulSoup 的 html.parser 快一个数量级
+try:
+    import lxml.html
+    from lxml import etree
+    PARSER_BACKEND = 'lxml'
+except ImportError:
+    lxml = None
+    PARSER_BACKEND = 'html.parser'
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'bing')
+PARSER_BACKENDS = ('lxml', 'html.parser')
+DROP_TAGS = ('script', 'style', 'nav', 'footer', 'header')
+MAX_CONTENT_LENGTH = 10000
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+class PageContent(NamedTuple):
+    title: str
+    text: str       # 去掉脚本/导航/页眉页脚后的正文，最多 MAX_CONTENT_LENGTH 字
+    links: list     # [(规范化后的绝对地址, 锚文本)]，包括导航和页脚里的链接
+
+def _collapse(text):
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+def _absolute_link(base_url, href):
+    absolute_url = urljoin(base_url, href.strip())
+    return normalize_url(absolute_url) if absolute_url.startswith('http') else None
+
+def _parse_lxml(page_html, base_url):
+    try:
+        # 传 bytes，带 <?xml encoding=...?> 声明的页面传 str 会报错
+        doc = lxml.html.document_fromstring(page_html.encode('utf-8'),
+                                            parser=lxml.html.HTMLParser(encoding='utf-8'))
+    except (etree.ParserError, ValueError):
+        return PageContent("无标题", '', [])
+    title_element = doc.find('.//title')
+    title = _collapse(title_element.text_content()) if title_element is not None else ''
+    links = []
+    for link in doc.iter('a'):
+        href = link.get('href')
+        absolute_url = _absolute_link(base_url, href) if href is not None else None
+        if absolute_url:
+            links.append((absolute_url, _collapse(link.text_content())))
+    # 取完链接再删掉导航等区域，和原来先取链接、再清理正文的结果一致
+    etree.strip_elements(doc, etree.Comment, etree.ProcessingInstruction, *DROP_TAGS, with_tail=False)
+    text = _collapse(' '.join(doc.itertext()))
+    return PageContent(title or "无标题", text[:MAX_CONTENT_LENGTH], links)
+
+def _parse_soup(page_html, base_url):
+    soup = BeautifulSoup(page_html, 'html.parser')
+    title = _collapse(soup.title.get_text()) if soup.title else ''
+    links = []
+    for link in soup.find_all('a', href=True):
+        absolute_url = _absolute_link(base_url, link['href'])
+        if absolute_url:
+            links.append((absolute_url, link.get_text(' ', strip=True)))
+    for tag in soup(DROP_TAGS):
+        tag.decompose()
+    text = _collapse(soup.get_text(separator=' ', strip=True))
+    return PageContent(title or "无标题", text[:MAX_CONTENT_LENGTH], links)
+
+def parse_page(page_html, base_url='', backend=None):
+    """一次解析得到标题、正文和链接；backend 默认用已安装的最快后端"""
+    backend = backend or PARSER_BACKEND
+    if backend == 'lxml':
+        if lxml is None:
+            raise ValueError("未安装 lxml")
+        return _parse_lxml(page_html, base_url)
+    if backend == 'html.parser':
+        return _parse_soup(page_html, base_url)
+    raise ValueError(f"不支持的解析后端: {backend}")
+
+def _exit_with_parent():
+    multiprocessing.parent_process().join()
+    os._exit(0)
+
+def init_worker():
+    """解析进程池的 initializer：主进程被强制结束时子进程跟着退出，不会留在后台"""
+    if multiprocessing.parent_process() is not None:
+        threading.Thread(target=_exit_with_parent, daemon=True).start()
+
+def benchmark(paths, rounds=50):
+    """对保存的 HTML 页面做解析微基准，输出每个后端每页的 CPU 时间"""
+    backends = [backend for backend in PARSER_BACKENDS if backend != 'lxml' or lxml is not None]
+    print(f"解析后端: {', '.join(backends)}（默认 {PARSER_BACKEND}）")
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            page_html = f.read()
+        base_url = 'https://example.com/' + os.path.basename(path)
+        for backend in backends:
+            page = parse_page(page_html, base_url, backend)
+            start = time.process_time()
+            for _ in range(rounds):
+                parse_page(page_html, base_url, backend)
+            per_page = (time.process_time() - start) / rounds
+            print(f"{os.path.basename(path)} [{backend}]: {len(page_html) / 1024:.1f} KB, {len(page.links)} 个链接, "
+                  f"正文 {len(page.text)} 字, {per_page * 1000:.3f} ms/页")
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1:] or sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html'))))
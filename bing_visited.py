@@ -0,0 +1,189 @@
+import math
+import time
+import sqlite3
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, unquote_plus, quote_plus
+
+# URL 规范化和已访问集合：同一页面带不同的锚点、跟踪参数或结尾斜杠时只爬一次
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'spm', 'ref_src'}
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+VISITED_STORES = ('memory', 'bloom', 'sqlite')
+
+def normalize_url(url):
+    """小写协议和域名、去掉默认端口/锚点/跟踪参数/结尾斜杠，查询参数按名称排序"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if ':' in host:
+        host = f"[{host}]"  # IPv6 地址要保留方括号，否则和端口分不开
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+    # 没有等号的参数（?a）和空值参数（?a=）在部分网站上含义不同，分开保留
+    query = []
+    for piece in parts.query.split('&'):
+        if not piece:
+            continue
+        key, sep, value = piece.partition('=')
+        key, value = unquote_plus(key), unquote_plus(value)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS:
+            query.append((key, sep, value))
+    query = '&'.join(f"{quote_plus(key)}{sep}{quote_plus(value)}" for key, sep, value in sorted(query))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+class MemoryVisited:
+    """普通集合，适合小规模爬取，只在本次运行内有效"""
+    def __init__(self, urls=()):
+        self.urls = set(urls)
+        self.statuses = {}
+
+    def add(self, url, depth=None):
+        """第一次见到时返回 True"""
+        if url in self.urls:
+            return False
+        self.urls.add(url)
+        return True
+
+    def __contains__(self, url):
+        return url in self.urls
+
+    def __len__(self):
+        return len(self.urls)
+
+    def mark(self, url, status):
+        self.statuses[url] = status
+
+    def count(self, status='done'):
+        return sum(1 for value in self.statuses.values() if value == status)
+
+    def pending(self):
+        """只在内存里记录，重新运行后无法恢复"""
+        return []
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class BloomVisited(MemoryVisited):
+    """布隆过滤器：内存固定为 capacity 和 error_rate 决定的大小，少量新 URL 会被误判为已访问"""
+    def __init__(self, capacity=10_000_000, error_rate=0.001):
+        self.size = int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.added = 0
+        self.status_counts = {}
+
+    def _positions(self, url):
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, url, depth=None):
+        new = False
+        for position in self._positions(url):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        self.added += new
+        return new
+
+    def __contains__(self, url):
+        return all(self.bits[position // 8] & (1 << position % 8) for position in self._positions(url))
+
+    def __len__(self):
+        return self.added
+
+    def mark(self, url, status):
+        # 不保存每个 URL 的状态，只计数
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def count(self, status='done'):
+        return self.status_counts.get(status, 0)
+
+class SqliteVisited:
+    """磁盘上的已访问表，同一查询的多次运行共用；上次运行只入队未爬完的 URL 在新的运行里可以重新入队；
+    同时作为断点：用同一个 run_id 打开时 pending 返回本次运行还没爬完的 URL"""
+    def __init__(self, db_path, run_id=None, commit_every=500):
+        self.db_path = db_path
+        self.run_id = run_id or time.strftime("%Y%m%d_%H%M%S")
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS visited (
+                                 url TEXT PRIMARY KEY,
+                                 status TEXT,
+                                 run_id TEXT,
+                                 updated_at REAL,
+                                 depth INTEGER)''')
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(visited)')]
+        if 'depth' not in columns:
+            self.conn.execute('ALTER TABLE visited ADD COLUMN depth INTEGER')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_visited_run ON visited (run_id, status)')
+        self.conn.commit()
+
+    def _changed(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.flush()
+
+    def add(self, url, depth=None):
+        cursor = self.conn.execute(
+            '''INSERT INTO visited VALUES (?, 'queued', ?, ?, ?)
+               ON CONFLICT(url) DO UPDATE SET status = 'queued', run_id = excluded.run_id,
+                                              updated_at = excluded.updated_at, depth = excluded.depth
+               WHERE visited.status NOT IN ('done', 'duplicate') AND visited.run_id != excluded.run_id''',
+            (url, self.run_id, time.time(), depth))
+        if cursor.rowcount:
+            self._changed()
+        return cursor.rowcount > 0
+
+    def __contains__(self, url):
+        return self.conn.execute('SELECT 1 FROM visited WHERE url = ?', (url,)).fetchone() is not None
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM visited').fetchone()[0]
+
+    def mark(self, url, status):
+        # 每爬完一页就提交，连同这一页新发现的链接；WAL + synchronous=NORMAL 下提交不需要 fsync，
+        # 进程被强制结束后最多重爬正在抓取的几页
+        self.conn.execute('UPDATE visited SET status = ?, updated_at = ? WHERE url = ?', (status, time.time(), url))
+        self.flush()
+
+    def count(self, status='done'):
+        return self.conn.execute('SELECT COUNT(*) FROM visited WHERE status = ? AND run_id = ?',
+                                 (status, self.run_id)).fetchone()[0]
+
+    def pending(self):
+        """本次运行已入队但还没爬完的 [url, depth]，按深度排序"""
+        rows = self.conn.execute('''SELECT url, depth FROM visited WHERE run_id = ? AND status = 'queued'
+                                     ORDER BY depth, updated_at''', (self.run_id,))
+        return [[url, depth or 1] for url, depth in rows]
+
+    def flush(self):
+        self.conn.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+def make_visited_store(kind, db_path=None, **kwargs):
+    if kind == 'memory':
+        return MemoryVisited()
+    if kind == 'bloom':
+        return BloomVisited(**kwargs)
+    if kind == 'sqlite':
+        return SqliteVisited(db_path, **kwargs)
+    raise ValueError(f"不支持的已访问存储: {kind}")
@@ -0,0 +1,45 @@
+import time
+
+# 64 位签名（图片 dHash、正文 SimHash）的近似查找，tag_dedupe 和 bing_dedupe 共用
+SIGNATURE_BITS = 64
+
+def _bands(value, count):
+    # 拆成 count 段，汉明距离 < count 的两个签名至少有一段完全相同
+    edges = [SIGNATURE_BITS * i // count for i in range(count + 1)]
+    return [(i, (value >> edges[i]) & ((1 << (edges[i + 1] - edges[i])) - 1)) for i in range(count)]
+
+class HammingIndex:
+    """汉明距离不超过 threshold 的近邻查找；签名同时存在 conn 的 table 表里（key_column 为主键），打开时载入"""
+    def __init__(self, conn, table, key_column, value_column, threshold):
+        self.conn = conn
+        self.table = table
+        self.threshold = threshold
+        self.band_count = threshold + 1
+        self.conn.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+                                  {key_column} TEXT PRIMARY KEY,
+                                  {value_column} INTEGER,
+                                  added_at REAL)''')
+        self.conn.commit()
+        # 分段倒排：(段号, 段值) -> [(签名, 键)]，查找时只比较至少有一段相同的候选
+        self.buckets = {}
+        for key, value in self.conn.execute(f'SELECT {key_column}, {value_column} FROM {table}'):
+            self._insert_bucket(value & 0xFFFFFFFFFFFFFFFF, key)
+
+    def _insert_bucket(self, value, key):
+        for band in _bands(value, self.band_count):
+            self.buckets.setdefault(band, []).append((value, key))
+
+    def find(self, value, accept=None):
+        """返回第一个足够接近的键，accept 不为 None 时跳过 accept(键) 为 False 的候选"""
+        for band in _bands(value, self.band_count):
+            for other, key in self.buckets.get(band, ()):
+                if bin(value ^ other).count('1') <= self.threshold and (accept is None or accept(key)):
+                    return key
+        return None
+
+    def add(self, value, key):
+        self._insert_bucket(value, key)
+        # SQLite INTEGER 是有符号 64 位
+        signed = value - (1 << 64) if value >= 1 << 63 else value
+        self.conn.execute(f'INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)', (key, signed, time.time()))
+        self.conn.commit()
@@ -1,8 +1,13 @@
 import streamlit as st
 import os
 import json
+import time
 import pandas as pd
-from bing_crawler import run_crawler, cancel_crawl, continue_crawl
+import bing_crawler
+from bing_crawler import run_crawler
+from bing_dedupe import DEFAULT_THRESHOLD
+from bing_output import EXTRA_FORMATS
+from bing_fetch import BROWSER_PROFILES, DEFAULT_PAGE_TIMEOUT
 
 st.set_page_config(layout="wide")
 
@@ -56,8 +61,13 @@ with col_main:
         max_results = st.number_input("最大搜索结果数", min_value=1, max_value=10000, value=st.session_state.last_config.get("max_results", 100), step=10)
         max_pages = st.number_input("最大翻页数", min_value=1, max_value=1000, value=st.session_state.last_config.get("max_pages", 10), step=1)
         max_depth = st.number_input("最大爬取深度", min_value=1, max_value=5, value=st.session_state.last_config.get("max_depth", 2), step=1)
+        dedupe = st.checkbox("跳过正文近似重复的页面", value=st.session_state.last_config.get("dedupe", True))
+        dedupe_threshold = st.number_input("近似重复阈值（SimHash 汉明距离，越大跳过的页面越多）", min_value=0, max_value=16, value=st.session_state.last_config.get("dedupe_threshold", DEFAULT_THRESHOLD), step=1)
         
         output_dir = st.text_input("输出目录", value=st.session_state.last_config.get("output_dir", r"D:\newshuju\bing"))
+        extra_formats = st.multiselect("额外输出格式（CSV 总是输出）", list(EXTRA_FORMATS), default=st.session_state.last_config.get("extra_formats", []))
+        browser_profile = st.selectbox("浏览器模式（fast 不加载图片/字体/样式表/广告，DOM 就绪即返回）", list(BROWSER_PROFILES), index=list(BROWSER_PROFILES).index(st.session_state.last_config.get("browser_profile", "fast")))
+        page_timeout = st.number_input("浏览器每页超时（秒）", min_value=3, max_value=120, value=st.session_state.last_config.get("page_timeout", DEFAULT_PAGE_TIMEOUT), step=1)
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -88,7 +98,12 @@ with col_main:
             "since": since.strftime("%Y%m%d") if since else None,
             "until": until.strftime("%Y%m%d") if until else None,
             "output_dir": output_dir,
-            "max_depth": max_depth
+            "max_depth": max_depth,
+            "dedupe": dedupe,
+            "dedupe_threshold": dedupe_threshold,
+            "extra_formats": extra_formats,
+            "browser_profile": browser_profile,
+            "page_timeout": page_timeout
         }
         with open(default_config_file, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
@@ -97,7 +112,7 @@ with col_main:
     # 运行控制
     if submit_button and not st.session_state.crawler_running:
         st.session_state.crawler_running = True
-        globals()['continue_crawl'] = False
+        bing_crawler.cancel_crawl = False
         save_last_config()
         with st.spinner("正在爬取 Bing 搜索结果..."):
             since_str = since.strftime("%Y%m%d") if since else None
@@ -112,7 +127,12 @@ with col_main:
                 until=until_str,
                 output_dir=output_dir,
                 max_depth=max_depth,
-                progress_callback=update_progress
+                progress_callback=update_progress,
+                dedupe=dedupe,
+                dedupe_threshold=dedupe_threshold,
+                extra_formats=extra_formats,
+                browser_profile=browser_profile,
+                page_timeout=page_timeout
             )
             st.session_state.crawler_result = {"csv_path": csv_path, "total_results": total_results}
             st.session_state.crawler_running = False
@@ -120,15 +140,14 @@ with col_main:
             st.success(f"爬取完成！共找到 {total_results} 个结果，结果已保存至 {csv_path}")
 
     if stop_button and st.session_state.crawler_running:
-        globals()['cancel_crawl'] = True
+        bing_crawler.cancel_crawl = True
         st.session_state.crawler_running = False
         save_last_config()
         st.success("爬取已中止！")
 
     if continue_button and not st.session_state.crawler_running:
         st.session_state.crawler_running = True
-        globals()['continue_crawl'] = True
-        globals()['cancel_crawl'] = False
+        bing_crawler.cancel_crawl = False
         save_last_config()
         with st.spinner("继续爬取 Bing 搜索结果..."):
             since_str = since.strftime("%Y%m%d") if since else None
@@ -143,7 +162,13 @@ with col_main:
                 until=until_str,
                 output_dir=output_dir,
                 max_depth=max_depth,
-                progress_callback=update_progress
+                progress_callback=update_progress,
+                resume=True,
+                dedupe=dedupe,
+                dedupe_threshold=dedupe_threshold,
+                extra_formats=extra_formats,
+                browser_profile=browser_profile,
+                page_timeout=page_timeout
             )
             st.session_state.crawler_result = {"csv_path": csv_path, "total_results": total_results}
             st.session_state.crawler_running = False
@@ -71,11 +71,17 @@ def render_chat():
     """
     st.markdown(chat_html, unsafe_allow_html=True)
 
+def read_uploaded(f):
+    # tag_down3 输出的 Parquet 带列类型，直接读取，不用再解析文本
+    if f.name.endswith(".parquet"):
+        return pd.read_parquet(f)
+    return pd.read_csv(f)
+
 def send_message(user_input, templates, api_key, uploaded_files):
     if not user_input.strip():
         return
     template = templates.get(st.session_state.selected_template, "无模板")
-    file_contents = [f"**文件: {f.name}**\n```\n{pd.read_csv(f).to_string(index=False)}\n```" for f in uploaded_files] if uploaded_files else "无上传文件"
+    file_contents = [f"**文件: {f.name}**\n```\n{read_uploaded(f).to_string(index=False)}\n```" for f in uploaded_files] if uploaded_files else "无上传文件"
     prompt = template.format(file_contents=file_contents, user_input=user_input)
     
     # 直接显示用户消息
@@ -141,7 +147,7 @@ def main():
 
     api_key = st.session_state.config.get("api_key", "")
     templates = load_prompt_templates()
-    uploaded_files = st.file_uploader("上传 CSV 文件", type=["csv"], accept_multiple_files=True)
+    uploaded_files = st.file_uploader("上传 CSV / Parquet 文件", type=["csv", "parquet"], accept_multiple_files=True)
 
     if send_clicked and user_input and api_key and templates:
         send_message(user_input, templates, api_key, uploaded_files)
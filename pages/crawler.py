@@ -2,7 +2,7 @@ import streamlit as st
 import asyncio
 import os
 import pandas as pd
-from tag_down3 import run_tag_down
+from tag_down3 import run_tag_down, resume_tag_down, find_unfinished_runs
 from utils import load_config, save_config
 
 st.markdown("""
@@ -35,12 +35,39 @@ def main():
         down_count = st.number_input("下载数量", min_value=50, max_value=10000, value=st.session_state.config.get("down_count", 100), step=50, help="建议为 50 的倍数")
         media_latest = st.checkbox("从 [最新] 标签页下载", value=st.session_state.config.get("media_latest", True))
         text_down = st.checkbox("仅下载文本内容", value=st.session_state.config.get("text_down", False))
+        watch = st.checkbox("增量模式（只抓取上次之后的新推文）", value=st.session_state.config.get("watch", False),
+                            help="同一查询每次运行只翻到上次见过的最新推文为止，新数据追加到 watch-*.csv")
+        pipelined = st.checkbox("流水线模式（翻页与下载并行）", value=st.session_state.config.get("pipelined", True))
+        shard_options = {"不分片": None, "按天": "day", "按小时": "hour"}
+        shard_label = st.selectbox("时间分片", list(shard_options.keys()),
+                                   index=list(shard_options.values()).index(st.session_state.config.get("shard_by")),
+                                   help="按 since/until 拆分时间窗口并发爬取，结果合并到同一个 CSV 并按推文去重")
+        shard_by = shard_options[shard_label]
+        output_format = st.selectbox("输出格式", ["csv", "parquet", "both"],
+                                     index=["csv", "parquet", "both"].index(st.session_state.config.get("output_format", "csv")),
+                                     help="Parquet 带列类型，聊天页和预览加载更快，需要安装 pyarrow")
+        profile_options = {"原图": "original", "中等尺寸": "medium", "缩略图": "thumbnail"}
+        profile_label = st.selectbox("下载档位", list(profile_options.keys()),
+                                     index=list(profile_options.values()).index(st.session_state.config.get("profile", "original")),
+                                     help="中等尺寸/缩略图下载 jpg 小图和低码率视频，大批量爬取时省流量和磁盘")
+        profile = profile_options[profile_label]
+        media_types = st.multiselect("媒体类型", ["Image", "Video"], default=st.session_state.config.get("media_types", ["Image", "Video"]))
+        byte_budget_mb = st.number_input("流量上限 (MB)", min_value=0, value=st.session_state.config.get("byte_budget_mb", 0), step=100,
+                                         help="本次下载的总大小上限，0 为不限")
+        dedupe_options = {"不去重": None, "硬链接到首张": "link", "删除重复": "drop"}
+        dedupe_label = st.selectbox("相似图片去重", list(dedupe_options.keys()),
+                                    index=list(dedupe_options.values()).index(st.session_state.config.get("dedupe")),
+                                    help="按感知哈希识别转推/搬运的相同图片，CSV 中记录首张图片的路径")
+        dedupe = dedupe_options[dedupe_label]
         submit_button = st.form_submit_button(label="开始下载", type="primary")
 
     st.session_state.config.update({
         "cookie": cookie, "tag": tag, "filter": _filter,
         "down_count": down_count, "media_latest": media_latest,
-        "text_down": text_down
+        "text_down": text_down, "pipelined": pipelined, "shard_by": shard_by,
+        "output_format": output_format, "profile": profile, "media_types": media_types,
+        "byte_budget_mb": byte_budget_mb, "dedupe": dedupe,
+        "watch": watch
     })
     save_config(st.session_state.config)
 
@@ -52,22 +79,57 @@ def main():
                 try:
                     result = asyncio.run(run_tag_down(
                         cookie=cookie, tag=tag, _filter=_filter,
-                        down_count=down_count, media_latest=media_latest, text_down=text_down
+                        down_count=down_count, media_latest=media_latest, text_down=text_down,
+                        pipelined=pipelined, shard_by=shard_by, output_format=output_format,
+                        profile=profile, media_types=media_types or None,
+                        byte_budget=byte_budget_mb * 1024 * 1024 or None, dedupe=dedupe,
+                        watch=watch
                     ))
-                    st.success(f"下载完成！共下载 {result['total_downloaded']} 条数据，保存路径: {result['folder_path']}")
-                    if "csv_path" in result and os.path.exists(result["csv_path"]):
-                        df = pd.read_csv(result["csv_path"])
-                        st.write("爬取结果预览：")
-                        st.dataframe(df.head(10))
-                        with open(result["csv_path"], "rb") as file:
-                            st.download_button(
-                                label="下载 CSV 文件",
-                                data=file,
-                                file_name=os.path.basename(result["csv_path"]),
-                                mime="text/csv"
-                            )
+                    show_result(result)
                 except Exception as e:
                     st.error(f"下载失败: {str(e)}")
 
+    # 中断的任务可以从检查点继续，沿用原来的游标和 CSV
+    unfinished_runs = find_unfinished_runs()
+    if unfinished_runs:
+        st.subheader("未完成的下载")
+        state_path = st.selectbox("选择要继续的任务", unfinished_runs)
+        if st.button("继续下载"):
+            if not cookie or "ct0" not in cookie:
+                st.error("请提供有效的 Twitter Cookie，需包含 auth_token 和 ct0！")
+            else:
+                with st.spinner("正在继续下载，请稍候..."):
+                    try:
+                        show_result(asyncio.run(resume_tag_down(state_path, cookie, pipelined=pipelined)))
+                    except Exception as e:
+                        st.error(f"续传失败: {str(e)}")
+
+def show_result(result):
+    st.success(f"下载完成！共下载 {result['total_downloaded']} 条数据，保存路径: {result['folder_path']}")
+    if not result.get("finished", True):
+        st.warning("本次下载未完成，可在下方“未完成的下载”中继续")
+    # 有 Parquet 时优先用它预览，CSV 第一行是运行时间，需要跳过
+    if result.get("parquet_path") and os.path.exists(result["parquet_path"]):
+        st.write("爬取结果预览：")
+        st.dataframe(pd.read_parquet(result["parquet_path"]).head(10))
+        with open(result["parquet_path"], "rb") as file:
+            st.download_button(
+                label="下载 Parquet 文件",
+                data=file,
+                file_name=os.path.basename(result["parquet_path"]),
+                mime="application/octet-stream"
+            )
+    elif result.get("csv_path") and os.path.exists(result["csv_path"]):
+        st.write("爬取结果预览：")
+        st.dataframe(pd.read_csv(result["csv_path"], skiprows=1, nrows=10))
+    if result.get("csv_path") and os.path.exists(result["csv_path"]):
+        with open(result["csv_path"], "rb") as file:
+            st.download_button(
+                label="下载 CSV 文件",
+                data=file,
+                file_name=os.path.basename(result["csv_path"]),
+                mime="text/csv"
+            )
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
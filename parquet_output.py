@@ -0,0 +1,40 @@
+import os
+
+# Parquet 输出依赖 pyarrow，未安装时只能输出 CSV / JSONL
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# tag_down3 和 bing_output 共用的 Parquet 写入：列类型固定，每次 write_rows 追加一个 row group
+class PartedParquetWriter:
+    def __init__(self, file_path, columns, column_types=None):
+        """column_types 为 {列名: 'timestamp' / 'int' / 'float'}，其余列为字符串；timestamp 列传毫秒时间戳"""
+        if pa is None:
+            raise ImportError("Parquet 输出需要安装 pyarrow")
+        arrow_types = {'timestamp': pa.timestamp('ms', tz='UTC'), 'int': pa.int64(), 'float': pa.float64()}
+        column_types = column_types or {}
+        self.schema = pa.schema([(name, arrow_types.get(column_types.get(name), pa.string())) for name in columns])
+        self.base_path = file_path
+        # 第一次写入时才创建文件，没有新行时不会留下空文件；没写过时 file_path 为 None
+        self.file_path = None
+        self.writer = None
+
+    def write_rows(self, rows):
+        if self.writer is None:
+            # Parquet 不能追加，续传/续爬时写到新的分片文件
+            stem = os.path.splitext(self.base_path)[0]
+            self.file_path = self.base_path
+            part = 1
+            while os.path.exists(self.file_path):
+                self.file_path = f'{stem}.part{part}.parquet'
+                part += 1
+            self.writer = pq.ParquetWriter(self.file_path, self.schema)
+        columns = list(zip(*rows))
+        arrays = [pa.array(column, type=field.type) for column, field in zip(columns, self.schema)]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
@@ -0,0 +1,76 @@
+import os
+import asyncio
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from hamming_index import HammingIndex
+
+# 下载后的图片感知哈希去重：同一张图被转推/搬运后会以不同的媒体地址出现，按 URL 去重识别不了
+HASH_SIZE = 8           # dHash 8x8 = 64 位
+DEFAULT_THRESHOLD = 4   # 汉明距离不超过阈值视为同一张图
+DEDUPE_MODES = ('link', 'drop')
+
+def image_hash(path):
+    """计算 dHash，不是图片或无法解码时返回 None（在进程池里执行）"""
+    try:
+        with Image.open(path) as img:
+            # JPEG 可以直接按缩小的尺寸解码，省掉大部分解码时间
+            img.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+            pixels = list(img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).getdata())
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            value = (value << 1) | (left > pixels[row * (HASH_SIZE + 1) + col + 1])
+    return value
+
+class ImageDeduper:
+    """mode 为 link 时重复图片换成指向首张图片的硬链接，为 drop 时直接删除；两种模式下 CSV 都记录首张图片的路径；
+    conn 为已打开的连接（例如 MediaIndex 的连接）时和它共用，避免同一个数据库文件上两个连接互相等写锁"""
+    def __init__(self, db_path=None, mode='link', threshold=DEFAULT_THRESHOLD, max_workers=None, conn=None):
+        if mode not in DEDUPE_MODES:
+            raise ValueError(f"不支持的去重模式: {mode}")
+        self.mode = mode
+        self.threshold = threshold
+        # 用 spawn 启动子进程：下载循环和线程池都在跑，fork 会把锁的状态一起复制过去
+        self.pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        self.own_conn = conn is None
+        self.conn = conn if conn is not None else sqlite3.connect(db_path or ':memory:')
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.hashes = HammingIndex(self.conn, 'image_hashes', 'saved_path', 'phash', threshold)
+        self.duplicates = 0
+        self.bytes_saved = 0
+
+    async def canonical_path(self, saved_path):
+        """返回图片应记录的路径：新图片返回自身，近似重复时处理掉副本并返回首张图片的路径"""
+        value = await asyncio.get_running_loop().run_in_executor(self.pool, image_hash, saved_path)
+        if value is None:
+            return saved_path
+        # 查找和写入之间没有 await，并发下载的两张相同图片不会都被当成新图片
+        canonical = self.hashes.find(value, accept=os.path.exists)
+        if canonical is None or os.path.abspath(canonical) == os.path.abspath(saved_path):
+            self.hashes.add(value, saved_path)
+            return saved_path
+        size = os.path.getsize(saved_path)
+        await asyncio.to_thread(self._replace_duplicate, saved_path, canonical)
+        self.duplicates += 1
+        self.bytes_saved += size
+        return canonical
+
+    def _replace_duplicate(self, saved_path, canonical):
+        os.remove(saved_path)
+        if self.mode == 'link':
+            try:
+                os.link(canonical, saved_path)
+            except OSError:
+                pass  # 跨盘或文件系统不支持硬链接时退化为删除
+
+    def close(self):
+        self.pool.shutdown()
+        if self.own_conn:
+            self.conn.close()
@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import time
+
+# tag_down3 的本地索引：记录已下载的媒体和已写入 CSV 的行，重复跑重叠的时间窗口时跳过已有内容；
+# 媒体文件所有查询共用，已写入的行按 scope（查询的保存文件夹）分开记录
+class MediaIndex:
+    def __init__(self, db_path, scope='', conn=None):
+        self.db_path = db_path
+        self.scope = scope
+        # conn 为 scoped() 传入的已打开连接，表已经建好
+        self.own_conn = conn is None
+        self.conn = conn if conn is not None else self._connect(db_path)
+        # 本次运行中已入队但尚未下载完成的媒体，避免同一页/相邻页重复入队
+        self._pending = set()
+        # 已写入输出但还没提交的行，commit() 时一次写入并提交，写事务不会跨过下载的 await
+        self._unsaved_rows = {}
+
+    @staticmethod
+    def _connect(db_path):
+        conn = sqlite3.connect(db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS media (
+                                 media_url TEXT PRIMARY KEY,
+                                 tweet_id TEXT,
+                                 saved_path TEXT,
+                                 size INTEGER,
+                                 downloaded_at REAL)''')
+        # row_key 为纯文本模式的推文 id 或媒体模式的媒体地址
+        conn.execute('''CREATE TABLE IF NOT EXISTS written_rows (
+                                 scope TEXT,
+                                 row_key TEXT,
+                                 url TEXT,
+                                 seen_at REAL,
+                                 PRIMARY KEY (scope, row_key))''')
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tweets'").fetchone():
+            # 旧版只按推文 id 记录、不知道写在哪个文件夹，迁移为空 scope，对所有查询都算已写入
+            conn.execute('''INSERT OR IGNORE INTO written_rows SELECT '', tweet_id, tweet_url, seen_at FROM tweets''')
+            conn.execute('DROP TABLE tweets')
+        # 增量模式的水位：每个查询已见过的最新推文 id
+        conn.execute('''CREATE TABLE IF NOT EXISTS watermarks (
+                                 query TEXT PRIMARY KEY,
+                                 since_id TEXT,
+                                 updated_at REAL)''')
+        conn.commit()
+        return conn
+
+    def scoped(self, scope):
+        """同一个索引上另一个保存文件夹的视图，共用连接（批量查询时每个查询一个）"""
+        return MediaIndex(self.db_path, scope, conn=self.conn)
+
+    def media_path(self, media_url):
+        """已下载媒体的保存路径，没下载过或文件被手动删掉时返回 None"""
+        row = self.conn.execute('SELECT saved_path FROM media WHERE media_url = ?', (media_url,)).fetchone()
+        return row[0] if row is not None and os.path.exists(row[0]) else None
+
+    def has_media(self, media_url):
+        # 文件被手动删掉时允许重新下载
+        return self.media_path(media_url) is not None
+
+    def claim_media(self, media_url):
+        """媒体未下载且未入队时返回 True 并标记为入队"""
+        if media_url in self._pending or self.has_media(media_url):
+            return False
+        self._pending.add(media_url)
+        return True
+
+    def add_media(self, media_url, tweet_id, saved_path, size):
+        self._pending.discard(media_url)
+        self.conn.execute('INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?)',
+                          (media_url, tweet_id, saved_path, size, time.time()))
+        self.conn.commit()
+
+    def release_media(self, media_url):
+        """下载失败时取消入队标记，下次运行可重试"""
+        self._pending.discard(media_url)
+
+    def has_row(self, row_key):
+        """当前 scope 已经写过这一行时返回 True"""
+        if row_key in self._unsaved_rows:
+            return True
+        return self.conn.execute("SELECT 1 FROM written_rows WHERE row_key = ? AND scope IN (?, '')",
+                                 (row_key, self.scope)).fetchone() is not None
+
+    def add_row(self, row_key, url):
+        # 随输出批量写盘时再统一写入，见 commit()
+        self._unsaved_rows[row_key] = (self.scope, row_key, url, time.time())
+
+    def get_watermark(self, query):
+        row = self.conn.execute('SELECT since_id FROM watermarks WHERE query = ?', (query,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, query, since_id):
+        self.conn.execute('INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)', (query, since_id, time.time()))
+        self.conn.commit()
+
+    def commit(self):
+        if self._unsaved_rows:
+            self.conn.executemany('INSERT OR IGNORE INTO written_rows VALUES (?, ?, ?, ?)', self._unsaved_rows.values())
+            self._unsaved_rows = {}
+        self.conn.commit()
+
+    def close(self):
+        self.commit()
+        if self.own_conn:
+            self.conn.close()
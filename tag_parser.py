@@ -0,0 +1,143 @@
+import os
+import sys
+import glob
+import json
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+# 有 orjson 时直接从 bytes 解析，省掉 response.text 的解码和 json 模块的二次处理
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    json_loads = json.loads
+    JSON_BACKEND = 'json'
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'twitter')
+
+class MediaRecord(NamedTuple):
+    media_type: str       # 'Image' / 'Video'
+    media_url: str        # 图片原始地址 media_url_https
+    variants: tuple       # 视频的 video_info.variants，图片为空
+
+class TweetRecord(NamedTuple):
+    tweet_id: str
+    time_stamp: int       # 毫秒时间戳
+    display_name: str
+    screen_name: str      # 带 @
+    tweet_url: str
+    content: str
+    favorite_count: int
+    retweet_count: int
+    reply_count: int
+    media: tuple          # MediaRecord
+
+class TimelinePage(NamedTuple):
+    cursor: Optional[str]  # 下一页游标，没有推文时为 None
+    tweets: list
+
+def _tweet_time(tweet):
+    edit_control = tweet.get('edit_control')
+    if edit_control and 'editable_until_msecs' in edit_control:
+        # 可编辑截止时间 = 发推时间 + 1 小时
+        return int(edit_control['editable_until_msecs']) - 3600000
+    created_at = datetime.strptime(tweet['legacy']['created_at'], '%a %b %d %H:%M:%S %z %Y')
+    return int(created_at.timestamp() * 1000)
+
+def parse_tweet(result):
+    """把 tweet_results.result 转成 TweetRecord，墓碑/不可见推文返回 None"""
+    if result.get('__typename') == 'TweetWithVisibilityResults' or ('tweet' in result and 'legacy' not in result):
+        result = result.get('tweet') or {}
+    legacy = result.get('legacy')
+    if not legacy:
+        return None
+    try:
+        user = result['core']['user_results']['result']['legacy']
+        screen_name = '@' + user['screen_name']
+        status_id = legacy['conversation_id_str']
+        media = tuple(
+            MediaRecord('Video', _media.get('media_url_https', ''), tuple(_media['video_info']['variants']))
+            if 'video_info' in _media else MediaRecord('Image', _media['media_url_https'], ())
+            for _media in legacy.get('extended_entities', {}).get('media', ())
+        )
+        return TweetRecord(
+            tweet_id=result.get('rest_id') or legacy.get('id_str') or status_id,
+            time_stamp=_tweet_time(result),
+            display_name=user['name'],
+            screen_name=screen_name,
+            tweet_url=f'https://twitter.com/{screen_name}/status/{status_id}',
+            content=legacy['full_text'].split('https://t.co/')[0],
+            favorite_count=legacy['favorite_count'],
+            retweet_count=legacy['retweet_count'],
+            reply_count=legacy['reply_count'],
+            media=media,
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _add_item_content(item_content, tweets):
+    if not item_content or 'tweet_results' not in item_content:
+        return
+    record = parse_tweet(item_content['tweet_results'].get('result') or {})
+    if record is not None:
+        tweets.append(record)
+
+def _handle_entry(entry, tweets):
+    """处理一个 timeline entry，是底部游标时返回游标值"""
+    entry_id = entry.get('entryId', '')
+    content = entry.get('content') or {}
+    if entry_id.startswith('cursor-'):
+        if content.get('cursorType') == 'Bottom' or entry_id.startswith('cursor-bottom'):
+            return content.get('value')
+        return None
+    if 'promoted' in entry_id:
+        return None
+    if 'itemContent' in content:
+        _add_item_content(content['itemContent'], tweets)
+    # Media 标签页第一页是网格模块，推文在 content.items 里
+    for item in content.get('items') or ():
+        _add_item_content((item.get('item') or {}).get('itemContent'), tweets)
+    return None
+
+def parse_timeline(raw):
+    """解析 SearchTimeline 响应（bytes 或 str），兼容第一页和游标页的不同结构"""
+    data = json_loads(raw)
+    try:
+        instructions = data['data']['search_by_raw_query']['search_timeline']['timeline']['instructions']
+    except (KeyError, TypeError):
+        return TimelinePage(None, [])
+
+    cursor = None
+    tweets = []
+    for instruction in instructions:
+        # TimelineAddEntries
+        for entry in instruction.get('entries') or ():
+            cursor = _handle_entry(entry, tweets) or cursor
+        # TimelineAddToModule：Media 标签页翻页时追加到网格模块
+        for item in instruction.get('moduleItems') or ():
+            _add_item_content((item.get('item') or {}).get('itemContent'), tweets)
+        # TimelineReplaceEntry：游标页的底部游标
+        if 'entry' in instruction:
+            cursor = _handle_entry(instruction['entry'], tweets) or cursor
+    if not tweets:
+        cursor = None
+    return TimelinePage(cursor, tweets)
+
+def benchmark(paths, rounds=200):
+    """对录制的响应做解析微基准，输出每页耗时"""
+    print(f"JSON 后端: {JSON_BACKEND}")
+    for path in paths:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        page = parse_timeline(raw)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            parse_timeline(raw)
+        per_page = (time.perf_counter() - start) / rounds
+        print(f"{os.path.basename(path)}: {len(raw) / 1024:.1f} KB, {len(page.tweets)} 条推文, "
+              f"{per_page * 1000:.3f} ms/页, {len(raw) / per_page / 1048576:.1f} MB/s")
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1:] or sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.json'))))
@@ -0,0 +1,119 @@
+import time
+import asyncio
+
+# SearchTimeline 默认配额：每个账号 15 分钟 50 次，拿到响应头后以响应头为准
+DEFAULT_RATE_LIMIT = 50
+DEFAULT_RATE_WINDOW = 15 * 60
+
+# 单个 cookie 的令牌桶：令牌数取自 x-rate-limit-remaining，到 x-rate-limit-reset 时补满
+class AccountLimiter:
+    def __init__(self, cookie, limit=DEFAULT_RATE_LIMIT, window=DEFAULT_RATE_WINDOW):
+        self.cookie = cookie
+        self.limit = limit
+        self.window = window
+        self.tokens = limit
+        self.reset_at = time.time() + window
+        self.requests = 0
+
+    def available(self, now):
+        if now >= self.reset_at:
+            self.tokens = self.limit
+            self.reset_at = now + self.window
+        return self.tokens
+
+    def consume(self):
+        self.tokens -= 1
+        self.requests += 1
+
+    def update(self, response):
+        """用响应头校正令牌数，429 时清空令牌直到重置"""
+        headers = response.headers
+        try:
+            remaining = headers.get('x-rate-limit-remaining')
+            if 'x-rate-limit-limit' in headers:
+                self.limit = int(headers['x-rate-limit-limit'])
+            if 'x-rate-limit-reset' in headers:
+                reset_at = float(headers['x-rate-limit-reset'])
+                if abs(reset_at - self.reset_at) > 1:
+                    # 第一次拿到响应头或进入了新窗口，直接采用服务器的数值
+                    self.reset_at = reset_at
+                    self.tokens = int(remaining) if remaining is not None else self.limit
+                    remaining = None
+            if remaining is not None:
+                # 同一窗口内还有其他请求在途，取较小值避免超发
+                self.tokens = min(self.tokens, int(remaining))
+        except ValueError:
+            pass
+        if response.status_code == 429:
+            self.tokens = 0
+
+# 多账号调度：每次请求挑令牌最多的账号，全部耗尽时等到最早的重置时间
+class AccountPool:
+    def __init__(self, cookies):
+        if isinstance(cookies, str):
+            cookies = [cookies]
+        self.accounts = [AccountLimiter(cookie) for cookie in cookies]
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # 持锁等待，保证多个查询按先来后到轮流使用配额
+        async with self._lock:
+            while True:
+                now = time.time()
+                account = max(self.accounts, key=lambda a: a.available(now))
+                if account.tokens > 0:
+                    account.consume()
+                    return account
+                wait = min(a.reset_at for a in self.accounts) - now + 1
+                print(f"所有账号配额已用完，等待 {wait:.0f} 秒后继续")
+                await asyncio.sleep(max(wait, 1))
+
+    def summary(self):
+        return [{'requests': a.requests, 'remaining': a.tokens, 'limit': a.limit,
+                 'reset_in': max(0, int(a.reset_at - time.time()))} for a in self.accounts]
+
+# 媒体下载的 AIMD 并发窗口：首字节延迟和错误率平稳时每轮加 1，超时/429/5xx 时减半
+class AdaptiveLimiter:
+    def __init__(self, initial=8, min_window=2, max_window=32, latency_factor=2.0, backoff_interval=1.0):
+        self.min_window = min_window
+        self.max_window = max(max_window, min_window)
+        self.window = min(max(initial, min_window), self.max_window)
+        self.latency_factor = latency_factor
+        self.backoff_interval = backoff_interval
+        self.in_flight = 0
+        self.baseline = None  # 首字节延迟的滑动平均
+        self._successes = 0
+        self._last_backoff = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.window)
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency):
+        if self.baseline is None:
+            self.baseline = latency
+        if latency <= self.baseline * self.latency_factor:
+            # 一整个窗口的请求都顺利完成才加 1，即每轮加性增长
+            self._successes += 1
+            if self._successes >= self.window and self.window < self.max_window:
+                self.window += 1
+                self._successes = 0
+        else:
+            self._successes = 0
+        self.baseline = self.baseline * 0.9 + latency * 0.1
+
+    def on_congestion(self):
+        # 同一批并发请求一起失败时只减半一次
+        now = time.monotonic()
+        if now - self._last_backoff < self.backoff_interval:
+            return
+        self._last_backoff = now
+        self.window = max(self.min_window, self.window // 2)
+        self._successes = 0
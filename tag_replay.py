@@ -0,0 +1,254 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import tag_down3
+from tag_parser import FIXTURE_DIR
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+# 本地回放服务器：用录制的 SearchTimeline 页面串成游标链，并按配置的延迟/带宽/错误率返回合成媒体，
+# 用于离线测量 run_tag_down 的吞吐，不需要访问 Twitter
+TWEET_ID_PATTERN = re.compile(r'(?<!\d)(19\d{17})')
+MEDIA_HOSTS = {'https://pbs.twimg.com': '/pbs', 'https://video.twimg.com': '/video'}
+# 按图片 name 参数和视频分辨率缩放返回的大小，用于比较不同下载档位
+IMAGE_SCALE = {'thumb': 1 / 16, 'small': 1 / 8, 'medium': 1 / 4, 'large': 1 / 2}
+VIDEO_RESOLUTION_PATTERN = re.compile(r'/vid/(\d+)x(\d+)/')
+PAYLOAD_BLOCK = bytes(random.Random(0).getrandbits(8) for _ in range(64 * 1024))
+
+class ReplayConfig:
+    def __init__(self, pages=20, api_latency=0.0, media_latency=0.0, bandwidth=0, error_rate=0.0,
+                 image_size=200 * 1024, video_size=2 * 1024 * 1024, rate_limit=10000):
+        self.pages = pages                  # 每条游标链的页数
+        self.api_latency = api_latency      # API 响应前等待的秒数
+        self.media_latency = media_latency  # 媒体首字节前等待的秒数
+        self.bandwidth = bandwidth          # 每个连接的带宽，字节/秒，0 为不限速
+        self.error_rate = error_rate        # 随机返回 503 的比例
+        self.image_size = image_size
+        self.video_size = video_size
+        self.rate_limit = rate_limit        # x-rate-limit-limit
+
+def _find_cursor_entries(node):
+    if isinstance(node, dict):
+        if str(node.get('entryId', '')).startswith('cursor-bottom'):
+            yield node
+        for value in node.values():
+            yield from _find_cursor_entries(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _find_cursor_entries(value)
+
+def build_pages(fixture_dir, product, page_count, media_base):
+    """把第一页/游标页模板展开成 page_count 页，推文 id 逐页偏移，游标串成 replay-1、replay-2 ..."""
+    prefix = 'media' if product == 'Media' else 'latest'
+    with open(os.path.join(fixture_dir, f'{prefix}_first.json'), 'r', encoding='utf-8') as f:
+        first = f.read()
+    with open(os.path.join(fixture_dir, f'{prefix}_cursor.json'), 'r', encoding='utf-8') as f:
+        following = f.read()
+    with open(os.path.join(fixture_dir, 'latest_end.json'), 'r', encoding='utf-8') as f:
+        end = f.read().encode('utf-8')
+    for host, path in MEDIA_HOSTS.items():
+        first = first.replace(host, media_base + path)
+        following = following.replace(host, media_base + path)
+
+    pages = []
+    for page_no in range(page_count):
+        template = first if page_no == 0 else following
+        text = TWEET_ID_PATTERN.sub(lambda m: str(int(m.group(1)) + page_no * 10 ** 13), template)
+        data = json.loads(text)
+        for entry in _find_cursor_entries(data):
+            entry['content']['value'] = f'replay-{page_no + 1}'
+        pages.append(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return pages, end
+
+class ReplayServer:
+    def __init__(self, config=None, host='127.0.0.1', port=0, fixture_dir=FIXTURE_DIR):
+        self.config = config or ReplayConfig()
+        self.fixture_dir = fixture_dir
+        self.counters = {'pages': 0, 'media': 0, 'bytes': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.base_url = f'http://{host}:{self.httpd.server_address[1]}'
+        self.pages = {product: build_pages(fixture_dir, product, self.config.pages, self.base_url)
+                      for product in ('Latest', 'Media')}
+        self._thread = None
+
+    def count(self, key, value=1):
+        with self._lock:
+            self.counters[key] += value
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path.endswith('/SearchTimeline'):
+                    self.serve_timeline(parse_qs(parsed.query))
+                else:
+                    self.serve_media(parsed.path, parse_qs(parsed.query))
+
+            def send_error_response(self):
+                server.count('errors')
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def serve_timeline(self, query):
+                config = server.config
+                time.sleep(config.api_latency)
+                if random.random() < config.error_rate:
+                    return self.send_error_response()
+                variables = json.loads(query.get('variables', ['{}'])[0])
+                cursor = variables.get('cursor') or ''
+                page_no = int(cursor.split('-')[1]) if cursor.startswith('replay-') else 0
+                pages, end = server.pages['Media' if variables.get('product') == 'Media' else 'Latest']
+                body = pages[page_no] if page_no < len(pages) else end
+                server.count('pages')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('x-rate-limit-limit', str(config.rate_limit))
+                self.send_header('x-rate-limit-remaining', str(config.rate_limit))
+                self.send_header('x-rate-limit-reset', str(int(time.time()) + 900))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def serve_media(self, path, query):
+                config = server.config
+                time.sleep(config.media_latency)
+                if random.random() < config.error_rate:
+                    return self.send_error_response()
+                if path.endswith('.mp4'):
+                    resolution = VIDEO_RESOLUTION_PATTERN.search(path)
+                    scale = int(resolution.group(1)) * int(resolution.group(2)) / (1280 * 720) if resolution else 1
+                    size = int(config.video_size * min(scale, 1))
+                else:
+                    size = int(config.image_size * IMAGE_SCALE.get(query.get('name', [''])[0], 1))
+                start = 0
+                range_header = self.headers.get('Range')
+                if range_header and range_header.startswith('bytes='):
+                    start = min(int(range_header[6:].split('-')[0] or 0), size)
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{size - 1}/{size}')
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Type', 'video/mp4' if path.endswith('.mp4') else 'image/png')
+                self.send_header('Content-Length', str(size - start))
+                self.send_header('Accept-Ranges', 'bytes')
+                self.end_headers()
+
+                remaining = size - start
+                chunk_time = len(PAYLOAD_BLOCK) / config.bandwidth if config.bandwidth else 0
+                try:
+                    while remaining > 0:
+                        chunk = PAYLOAD_BLOCK[:remaining]
+                        self.wfile.write(chunk)
+                        remaining -= len(chunk)
+                        server.count('bytes', len(chunk))
+                        if chunk_time:
+                            time.sleep(chunk_time * len(chunk) / len(PAYLOAD_BLOCK))
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                server.count('media')
+
+        return Handler
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位是 KB，macOS 是字节
+    return peak / 1048576 if sys.platform == 'darwin' else peak / 1024
+
+def run_benchmark(args):
+    config = ReplayConfig(pages=args.pages, api_latency=args.api_latency, media_latency=args.media_latency,
+                          bandwidth=args.bandwidth, error_rate=args.error_rate, image_size=args.image_size,
+                          video_size=args.video_size)
+    server = ReplayServer(config).start()
+    tag_down3.API_BASE = server.base_url
+    try:
+        with tempfile.TemporaryDirectory() as base_path:
+            start = time.perf_counter()
+            result = asyncio.run(tag_down3.run_tag_down(
+                cookie='auth_token=replay; ct0=replay;', tag='#replay', _filter='since:2025-04-06',
+                down_count=args.down_count, media_latest=args.product == 'Latest', text_down=args.text_down,
+                base_path=base_path, use_index=False, pipelined=args.pipelined,
+                max_concurrent_requests=args.concurrency, adaptive=not args.fixed_concurrency,
+                profile=args.profile, byte_budget=args.byte_budget or None
+            ))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    counters = server.counters
+    rss = peak_rss_mb()
+    print(f"耗时 {elapsed:.2f}s，写入 {result['total_downloaded']} 条，{result['bytes'] / 1048576:.1f} MB")
+    print(f"API: {counters['pages']} 页, {counters['pages'] / elapsed:.2f} 页/s")
+    print(f"媒体: {counters['media']} 个, {counters['media'] / elapsed:.2f} 个/s, "
+          f"{counters['bytes'] / elapsed / 1048576:.2f} MB/s, 注入错误 {counters['errors']} 次")
+    print(f"峰值 RSS: {rss:.1f} MB（含回放服务器）" if rss is not None else "峰值 RSS: 当前平台不支持")
+
+def main():
+    parser = argparse.ArgumentParser(description='tag_down3 离线回放服务器与吞吐基准')
+    parser.add_argument('command', choices=['serve', 'bench'])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--pages', type=int, default=20, help='每条游标链的页数')
+    parser.add_argument('--api-latency', type=float, default=0.05)
+    parser.add_argument('--media-latency', type=float, default=0.02)
+    parser.add_argument('--bandwidth', type=int, default=0, help='每个连接的带宽（字节/秒），0 为不限速')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--image-size', type=int, default=200 * 1024)
+    parser.add_argument('--video-size', type=int, default=2 * 1024 * 1024)
+    parser.add_argument('--product', choices=['Latest', 'Media'], default='Latest')
+    parser.add_argument('--down-count', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--fixed-concurrency', action='store_true', help='关闭 AIMD 自适应并发')
+    parser.add_argument('--pipelined', action='store_true')
+    parser.add_argument('--text-down', action='store_true')
+    parser.add_argument('--profile', choices=list(tag_down3.DOWNLOAD_PROFILES), default='original')
+    parser.add_argument('--byte-budget', type=int, default=0, help='本次运行的总字节上限，0 为不限')
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        run_benchmark(args)
+        return
+    config = ReplayConfig(pages=args.pages, api_latency=args.api_latency, media_latency=args.media_latency,
+                          bandwidth=args.bandwidth, error_rate=args.error_rate, image_size=args.image_size,
+                          video_size=args.video_size)
+    server = ReplayServer(config, port=args.port)
+    print(f"回放服务器已启动: {server.base_url}，设置环境变量 TAG_DOWN_API_BASE={server.base_url} 后运行 tag_down3")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()